@@ -0,0 +1,29 @@
+"""
+Move old completed and cancelled orders into the monthly archive collections.
+Meant to be run periodically (e.g. nightly from cron).
+
+    python archive_orders.py               # uses ORDER_ARCHIVE_AFTER_DAYS
+    python archive_orders.py --days 90
+"""
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from core.config import settings
+from core.archive import archive_orders
+
+async def run_archive(days: int):
+    """Archive orders and print a per-collection summary"""
+    client = AsyncIOMotorClient(settings.DATABASE_URL)
+    db = client[settings.DATABASE_NAME]
+
+    moved = await archive_orders(db, older_than_days=days)
+    for name, count in sorted(moved.items()):
+        print(f"✓ {count} orders → {name}")
+    print(f"✓ Archived {sum(moved.values())} orders older than {days} days")
+
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    asyncio.run(run_archive(parser.parse_args().days))
@@ -0,0 +1,89 @@
+"""
+Microbenchmark: cost per document of the validated response path versus the
+fast path (document_to_dict + orjson) for orders and menu items. No database
+needed; documents are generated in memory.
+
+    python bench_serialization.py            # 2000 documents per run
+    python bench_serialization.py 10000
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from core.serialization import FastJSONResponse, document_to_dict
+from models.pos_models import MenuItem, Order
+
+
+def make_order(i: int) -> dict:
+    items = [
+        {
+            "menu_item_id": str(ObjectId()),
+            "quantity": 1 + line % 3,
+            "special_instructions": "No onions" if line == 0 else None,
+            "size": {"name": "Large", "price_modifier": 2.5},
+            "addons": [{"name": "Extra Cheese", "price": 1.5}],
+            "price_per_item": 9.5,
+            "subtotal": 9.5 * (1 + line % 3),
+        }
+        for line in range(4)
+    ]
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "items": items,
+        "status": "completed",
+        "table_number": i % 20,
+        "customer_name": f"Guest {i}",
+        "notes": None,
+        "total_amount": sum(item["subtotal"] for item in items),
+        "payment": {"method": "cash", "amount": 100.0, "paid_at": now},
+        "version": 2,
+        "created_by": str(ObjectId()),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def make_menu_item(i: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "name": f"Burger {i}",
+        "description": "Beef patty, lettuce, tomato",
+        "price": 8.99,
+        "category_id": str(ObjectId()),
+        "image_url": f"/uploads/images/{i}.jpg",
+        "available": True,
+        "sizes": [{"name": "Small", "price_modifier": 0.0}, {"name": "Large", "price_modifier": 2.5}],
+        "addons": [{"name": "Extra Cheese", "price": 1.5}, {"name": "Bacon", "price": 2.0}],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def validated_path(model, docs):
+    """What the routes did before: build models, let FastAPI re-validate them, encode with json."""
+    objects = [model(**doc, id=str(doc["_id"])) for doc in docs]
+    revalidated = [model.model_validate(obj.model_dump()) for obj in objects]
+    return json.dumps(jsonable_encoder(revalidated), separators=(",", ":")).encode()
+
+
+def fast_path(model, docs):
+    return FastJSONResponse([document_to_dict(model, doc) for doc in docs]).body
+
+
+def bench(label, model, docs, repeat=5):
+    assert json.loads(validated_path(model, docs)) == json.loads(fast_path(model, docs))
+    for name, path in (("validated", validated_path), ("fast", fast_path)):
+        best = min(timeit.repeat(lambda: path(model, docs), number=1, repeat=repeat))
+        print(f"{label:<10} {name:<10} {best / len(docs) * 1e6:8.2f} µs/doc")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bench("order", Order, [make_order(i) for i in range(count)])
+    bench("menu_item", MenuItem, [make_menu_item(i) for i in range(count)])
@@ -0,0 +1,295 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.pos_models import OrderStatus
+
+from .archive import collection_overlaps, naive_utc, order_collection_names
+
+FETCH_BATCH_SIZE = 5000
+CACHE_SECONDS = 60
+
+# Only fields the reports use; keeps documents on the wire small
+SALES_PROJECTION = {
+    "_id": 0,
+    "created_at": 1,
+    "total_amount": 1,
+    "items.menu_item_id": 1,
+    "items.quantity": 1,
+    "items.subtotal": 1,
+    "items.addons.name": 1,
+}
+
+
+class Vocabulary:
+    """Maps string keys to dense integer codes so they can live in NumPy arrays."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.keys: List[str] = []
+
+    def code(self, key: str) -> int:
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.keys)
+            self.keys.append(key)
+        return code
+
+
+class SalesFrame:
+    """
+    Columnar view of the sold line items in a period.
+
+    Order-level columns (one entry per order): `order_total`, `order_hour`,
+    `order_weekday`. Line-level columns (one entry per line item): `line_order`
+    (index into the order columns), `line_item` (code in `menu_items`),
+    `line_quantity`, `line_subtotal`. Addons are stored flat: `addon_line`
+    (index into the line columns) and `addon_code` (code in `addons`).
+
+    Batches are added with append_batch() and the columns are assembled by
+    finish(), so each value is copied into its final array only once.
+    """
+
+    COLUMNS = {
+        "order_total": np.float64,
+        "order_hour": np.int8,
+        "order_weekday": np.int8,
+        "line_order": np.int64,
+        "line_item": np.int32,
+        "line_quantity": np.int32,
+        "line_subtotal": np.float64,
+        "addon_line": np.int64,
+        "addon_code": np.int32,
+    }
+
+    def __init__(self):
+        self.menu_items = Vocabulary()
+        self.addons = Vocabulary()
+        self.order_count = 0
+        self.line_count = 0
+        self._chunks: Dict[str, List[np.ndarray]] = {column: [] for column in self.COLUMNS}
+        self.finish()
+
+    def append_batch(self, orders: List[dict]):
+        """
+        Convert one batch of order documents into column chunks.
+        """
+        created_at, totals = [], []
+        line_order, line_item, line_quantity, line_subtotal = [], [], [], []
+        addon_line, addon_code = [], []
+
+        for position, order in enumerate(orders):
+            created_at.append(order["created_at"])
+            totals.append(order["total_amount"])
+            for item in order.get("items", []):
+                line_index = self.line_count + len(line_item)
+                line_order.append(self.order_count + position)
+                line_item.append(self.menu_items.code(item["menu_item_id"]))
+                line_quantity.append(item["quantity"])
+                line_subtotal.append(item["subtotal"])
+                for addon in item.get("addons", []):
+                    addon_line.append(line_index)
+                    addon_code.append(self.addons.code(addon["name"]))
+
+        timestamps = np.array(created_at, dtype="datetime64[ms]")
+        hours = timestamps.astype("datetime64[h]").astype(np.int64)
+        days = timestamps.astype("datetime64[D]").astype(np.int64)
+
+        values = {
+            "order_total": totals,
+            "order_hour": hours % 24,
+            # 1970-01-01 was a Thursday; shift so Monday is 0
+            "order_weekday": (days + 3) % 7,
+            "line_order": line_order,
+            "line_item": line_item,
+            "line_quantity": line_quantity,
+            "line_subtotal": line_subtotal,
+            "addon_line": addon_line,
+            "addon_code": addon_code,
+        }
+        for column, dtype in self.COLUMNS.items():
+            self._chunks[column].append(np.asarray(values[column], dtype=dtype))
+        self.order_count += len(orders)
+        self.line_count += len(line_item)
+
+    def finish(self) -> "SalesFrame":
+        for column, dtype in self.COLUMNS.items():
+            chunks = self._chunks[column]
+            setattr(self, column, np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype))
+        self._chunks = {column: [] for column in self.COLUMNS}
+        return self
+
+
+_cache: Dict[Tuple, Tuple[float, SalesFrame]] = {}
+# Loads in progress, shared by concurrent requests for the same range
+_loading: Dict[Tuple, asyncio.Future] = {}
+_ABANDONED = object()
+
+
+async def _read_sales_frame(
+    db: AsyncIOMotorDatabase,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> SalesFrame:
+    query = {"status": OrderStatus.COMPLETED.value}
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+
+    # Building the arrays is CPU work; keep it off the event loop
+    frame = SalesFrame()
+    for name in await order_collection_names(db):
+        if not collection_overlaps(name, created_from, created_to):
+            continue
+        batch = []
+        async for order in db[name].find(query, SALES_PROJECTION).batch_size(FETCH_BATCH_SIZE):
+            batch.append(order)
+            if len(batch) >= FETCH_BATCH_SIZE:
+                await asyncio.to_thread(frame.append_batch, batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(frame.append_batch, batch)
+    return await asyncio.to_thread(frame.finish)
+
+
+async def load_sales_frame(
+    db: AsyncIOMotorDatabase,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> SalesFrame:
+    """
+    Load completed orders created in [created_from, created_to), hot and
+    archived, into a SalesFrame. Results are reused for CACHE_SECONDS, and
+    concurrent requests for the same range share one load, so a report page
+    calling several endpoints only reads the orders once.
+    """
+    created_from, created_to = naive_utc(created_from), naive_utc(created_to)
+    key = (created_from, created_to)
+    cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < CACHE_SECONDS:
+        return cached[1]
+
+    pending = _loading.get(key)
+    if pending is not None:
+        frame = await asyncio.shield(pending)
+        if frame is _ABANDONED:
+            return await load_sales_frame(db, created_from, created_to)
+        return frame
+
+    future = asyncio.get_running_loop().create_future()
+    _loading[key] = future
+    try:
+        frame = await _read_sales_frame(db, created_from, created_to)
+    except asyncio.CancelledError:
+        # The loading request went away; anyone waiting on it loads for themselves
+        future.set_result(_ABANDONED)
+        raise
+    except BaseException as exc:
+        future.set_exception(exc)
+        # Waiters re-raise it; retrieve it here so an unawaited future doesn't warn
+        future.exception()
+        raise
+    else:
+        future.set_result(frame)
+    finally:
+        del _loading[key]
+
+    # Drop expired entries so the cache can't grow without bound
+    now = time.monotonic()
+    for stale in [k for k, (loaded_at, _) in _cache.items() if now - loaded_at >= CACHE_SECONDS]:
+        del _cache[stale]
+    _cache[key] = (now, frame)
+    return frame
+
+
+def top_sellers(frame: SalesFrame, limit: int = 10) -> List[dict]:
+    """Menu items ranked by units sold, with their revenue."""
+    size = len(frame.menu_items.keys)
+    units = np.bincount(frame.line_item, weights=frame.line_quantity, minlength=size)
+    revenue = np.bincount(frame.line_item, weights=frame.line_subtotal, minlength=size)
+    ranked = np.argsort(-units, kind="stable")[:limit]
+    return [
+        {
+            "menu_item_id": frame.menu_items.keys[code],
+            "quantity": int(units[code]),
+            "revenue": round(float(revenue[code]), 2),
+        }
+        for code in ranked
+    ]
+
+
+def revenue_by_category(frame: SalesFrame, item_categories: Dict[str, str]) -> List[dict]:
+    """
+    Revenue and units per category. `item_categories` maps menu item ids to
+    category ids; items no longer on the menu are grouped under None.
+    """
+    categories = Vocabulary()
+    item_to_category = np.array(
+        [categories.code(item_categories.get(item_id)) for item_id in frame.menu_items.keys],
+        dtype=np.int32,
+    )
+    line_category = item_to_category[frame.line_item] if frame.line_count else np.empty(0, dtype=np.int32)
+    size = len(categories.keys)
+    revenue = np.bincount(line_category, weights=frame.line_subtotal, minlength=size)
+    units = np.bincount(line_category, weights=frame.line_quantity, minlength=size)
+    ranked = np.argsort(-revenue, kind="stable")
+    return [
+        {
+            "category_id": categories.keys[code],
+            "quantity": int(units[code]),
+            "revenue": round(float(revenue[code]), 2),
+        }
+        for code in ranked
+    ]
+
+
+def sales_heatmap(frame: SalesFrame) -> dict:
+    """Orders and revenue by weekday (rows, Monday first) and hour of day (columns)."""
+    cell = frame.order_weekday.astype(np.int64) * 24 + frame.order_hour
+    orders = np.bincount(cell, minlength=7 * 24).reshape(7, 24)
+    revenue = np.bincount(cell, weights=frame.order_total, minlength=7 * 24).reshape(7, 24)
+    return {
+        "orders": orders.astype(int).tolist(),
+        "revenue": np.round(revenue, 2).tolist(),
+    }
+
+
+def addon_attach_rates(frame: SalesFrame) -> List[dict]:
+    """
+    For each addon, how many line items carried it and what share of all line
+    items that is.
+    """
+    if not frame.line_count:
+        return []
+    # Count each addon at most once per line item
+    pairs = np.unique(frame.addon_line * len(frame.addons.keys) + frame.addon_code)
+    lines = np.bincount(pairs % max(len(frame.addons.keys), 1), minlength=len(frame.addons.keys))
+    ranked = np.argsort(-lines, kind="stable")
+    return [
+        {
+            "name": frame.addons.keys[code],
+            "lines": int(lines[code]),
+            "attach_rate": round(float(lines[code]) / frame.line_count, 4),
+        }
+        for code in ranked
+    ]
+
+
+def ticket_size(frame: SalesFrame) -> dict:
+    """Average and median order total, and average units per order."""
+    if not frame.order_count:
+        return {"orders": 0, "average_total": 0.0, "median_total": 0.0, "average_units": 0.0}
+    units = np.bincount(frame.line_order, weights=frame.line_quantity, minlength=frame.order_count)
+    return {
+        "orders": frame.order_count,
+        "average_total": round(float(frame.order_total.mean()), 2),
+        "median_total": round(float(np.median(frame.order_total)), 2),
+        "average_units": round(float(units.mean()), 2),
+    }
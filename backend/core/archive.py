@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from models.pos_models import OrderStatus
+
+from .config import settings
+
+ARCHIVE_PREFIX = "orders_archive_"
+ARCHIVABLE_STATUSES = [OrderStatus.COMPLETED.value, OrderStatus.CANCELLED.value]
+DUPLICATE_KEY = 11000
+
+# Exports walk archives by (created_at, _id) and reports filter them on
+# status and created_at; the same keyset indexes as the hot collection
+ARCHIVE_INDEXES = [
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_keyset"),
+    IndexModel(
+        [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="status_created_at_keyset",
+    ),
+]
+
+
+def archive_collection_name(moment: datetime) -> str:
+    return f"{ARCHIVE_PREFIX}{moment:%Y_%m}"
+
+
+def naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """
+    Orders store naive UTC datetimes; convert timezone-aware query bounds
+    (e.g. "...Z" or "+08:00") to match, so they can be compared and queried.
+    """
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year + month // 13, (month - 1) % 12 + 1, 1)
+
+
+def collection_overlaps(name: str, created_from: Optional[datetime], created_to: Optional[datetime]) -> bool:
+    """
+    Whether an order collection can hold orders created in [created_from, created_to).
+    Always true for the hot collection; archives are checked against their month.
+    """
+    if not name.startswith(ARCHIVE_PREFIX):
+        return True
+    year, month = (int(part) for part in name[len(ARCHIVE_PREFIX):].split("_"))
+    if created_from and _month_start(year, month + 1) <= created_from:
+        return False
+    if created_to and _month_start(year, month) >= created_to:
+        return False
+    return True
+
+
+async def archive_collection_names(db: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Names of the existing archive collections, oldest month first.
+    """
+    names = await db.list_collection_names(filter={"name": {"$regex": f"^{ARCHIVE_PREFIX}"}})
+    return sorted(names)
+
+
+async def order_collection_names(db: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Every collection holding orders: the hot collection followed by the archives.
+    Reporting code that needs the full history should scan all of them.
+    """
+    return ["orders"] + await archive_collection_names(db)
+
+
+async def find_archived_order(db: AsyncIOMotorDatabase, obj_id: ObjectId) -> Optional[dict]:
+    """
+    Look an order up in the archives. The ObjectId embeds its creation time,
+    which points at the right monthly collection without scanning the others.
+    """
+    generated = obj_id.generation_time.replace(tzinfo=None)
+    # The id can be generated a moment after created_at, across a month boundary
+    previous_month = generated.replace(day=1) - timedelta(days=1)
+    for name in (archive_collection_name(generated), archive_collection_name(previous_month)):
+        order = await db[name].find_one({"_id": obj_id})
+        if order:
+            return order
+    return None
+
+
+async def archive_orders(
+    db: AsyncIOMotorDatabase,
+    older_than_days: int = settings.ORDER_ARCHIVE_AFTER_DAYS,
+    batch_size: int = settings.ORDER_ARCHIVE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Move completed and cancelled orders last updated more than `older_than_days`
+    ago into per-month archive collections (by creation month), `batch_size`
+    orders at a time. Safe to re-run after an interruption: copies are
+    upserted, and an order is only removed from the hot collection if it
+    hasn't changed since it was copied.
+    Returns the number of orders moved per archive collection.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = {"status": {"$in": ARCHIVABLE_STATUSES}, "updated_at": {"$lt": cutoff}}
+    moved = defaultdict(int)
+    indexed = set()
+
+    while True:
+        batch = await db.orders.find(query).sort("_id", 1).limit(batch_size).to_list(None)
+        if not batch:
+            break
+
+        by_collection = defaultdict(list)
+        for order in batch:
+            by_collection[archive_collection_name(order["created_at"])].append(order)
+
+        for name, orders in by_collection.items():
+            if name not in indexed:
+                # No-op when the archive already has them
+                await db[name].create_indexes(ARCHIVE_INDEXES)
+                indexed.add(name)
+            # Replace rather than insert, so a re-run overwrites a stale copy
+            try:
+                await db[name].bulk_write(
+                    [ReplaceOne({"_id": order["_id"]}, order, upsert=True) for order in orders], ordered=False
+                )
+            except BulkWriteError as exc:
+                errors = exc.details.get("writeErrors", [])
+                if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+
+        # Only delete orders still matching what was copied; one changed since
+        # the read no longer passes the `updated_at` condition
+        ids = [order["_id"] for order in batch]
+        result = await db.orders.delete_many({"_id": {"$in": ids}, **query})
+        kept = set()
+        if result.deleted_count < len(batch):
+            # Drop the outdated copies; those orders stay in the hot collection
+            kept = {doc["_id"] for doc in await db.orders.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)}
+            for name, orders in by_collection.items():
+                stale = [order["_id"] for order in orders if order["_id"] in kept]
+                if stale:
+                    await db[name].delete_many({"_id": {"$in": stale}})
+        for name, orders in by_collection.items():
+            moved[name] += sum(1 for order in orders if order["_id"] not in kept)
+
+    return dict(moved)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .config import settings
+
+
+class MenuCatalog:
+    """
+    In-process cache of menu item documents keyed by their string id.
+
+    The whole menu_items collection is loaded with a single query and kept
+    until a menu write calls invalidate() or the TTL runs out. Every
+    invalidation bumps `version`.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._items: Optional[Dict[str, dict]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+        self._items = None
+
+    def _is_fresh(self) -> bool:
+        if self._items is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def get_items(self, db: AsyncIOMotorDatabase) -> Dict[str, dict]:
+        if self._is_fresh():
+            return self._items
+
+        async with self._lock:
+            if self._is_fresh():
+                return self._items
+
+            version = self.version
+            docs = await db.menu_items.find().to_list(None)
+            items = {str(doc["_id"]): doc for doc in docs}
+            # Don't keep a snapshot that a concurrent write has already invalidated
+            if version == self.version:
+                self._items = items
+                self._loaded_at = time.monotonic()
+            return items
+
+    async def get_many(self, db: AsyncIOMotorDatabase, item_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Return the cached documents for `item_ids`. Ids missing from the cache
+        (e.g. created by another worker) are fetched with one `$in` query.
+        """
+        item_ids = list(item_ids)
+        items = await self.get_items(db)
+        found = {item_id: items[item_id] for item_id in item_ids if item_id in items}
+
+        missing = [ObjectId(item_id) for item_id in set(item_ids) - found.keys()]
+        if missing:
+            docs = await db.menu_items.find({"_id": {"$in": missing}}).to_list(None)
+            for doc in docs:
+                found[str(doc["_id"])] = doc
+        return found
+
+
+menu_catalog = MenuCatalog(ttl_seconds=settings.MENU_CATALOG_TTL_SECONDS)
@@ -7,6 +7,33 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "a_super_secret_key_that_should_be_changed")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    MENU_CATALOG_TTL_SECONDS: int = 60
+    ENSURE_INDEXES_ON_STARTUP: bool = True
+    ORDER_STREAM_QUEUE_SIZE: int = 100
+    ORDER_STREAM_HEARTBEAT_SECONDS: int = 15
+    ORDER_INGEST_ENABLED: bool = False
+    ORDER_INGEST_BATCH_SIZE: int = 50
+    ORDER_INGEST_MAX_DELAY_MS: int = 5
+    ORDER_INGEST_QUEUE_SIZE: int = 1000
+    ORDER_ARCHIVE_AFTER_DAYS: int = 30
+    ORDER_ARCHIVE_BATCH_SIZE: int = 500
+    IMAGE_WORKERS: int = 2
+    IMAGE_ORPHAN_SWEEP_INTERVAL_SECONDS: int = 3600
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_HEAVY_MAX_IN_FLIGHT: int = 32
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_COMPRESSORS: str = ""
+    MONGO_RETRY_WRITES: bool = True
+    METRICS_ENABLED: bool = True
 
     class Config:
         env_file = ".env"
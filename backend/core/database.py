@@ -1,5 +1,27 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from .config import settings
+from .db_monitor import pool_monitor
+from .metrics import command_metrics
+
+def client_options() -> dict:
+    """
+    Connection pool, timeout and compression options for the Mongo client.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "retryWrites": settings.MONGO_RETRY_WRITES,
+        "event_listeners": [pool_monitor],
+    }
+    # 0 keeps pymongo's default of waiting for a connection indefinitely
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    if settings.METRICS_ENABLED:
+        options["event_listeners"].append(command_metrics)
+    return options
 
 class Database:
     def __init__(self):
@@ -7,7 +29,7 @@ class Database:
         self.db = None
 
     async def connect(self):
-        self.client = AsyncIOMotorClient(settings.DATABASE_URL)
+        self.client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options())
         self.db = self.client[settings.DATABASE_NAME]
         print("Database connected...")
 
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+from pymongo import monitoring
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool statistics from pymongo's pool events: open and
+    checked out connections, checkout failures, and how long requests wait
+    to get a connection. Events arrive on pymongo's threads, hence the lock.
+    """
+
+    def __init__(self, samples: int = 1024):
+        self._lock = threading.Lock()
+        self.pools_created = 0
+        self.pools_cleared = 0
+        self.connections_open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self._waits = deque(maxlen=samples)
+
+    def _record_wait(self, event):
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            return
+        wait_ms = duration * 1000
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        self._waits.append(wait_ms)
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools_created += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self._record_wait(event)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = list(self._waits)
+            attempts = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "pools_created": self.pools_created,
+                "pools_cleared": self.pools_cleared,
+                "connections_open": self.connections_open,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_ms": {
+                    "avg": round(self.wait_total_ms / attempts, 3) if attempts else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "p50": round(_percentile(waits, 0.50), 3),
+                    "p95": round(_percentile(waits, 0.95), 3),
+                    "p99": round(_percentile(waits, 0.99), 3),
+                },
+            }
+
+
+async def ping(client) -> dict:
+    """
+    Round trip a ping to the server, reporting its latency.
+    """
+    started = time.perf_counter()
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        return {"ok": False, "error": type(e).__name__, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+pool_monitor = PoolMonitor()
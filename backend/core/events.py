@@ -0,0 +1,58 @@
+import asyncio
+import json
+from typing import Set
+
+from .config import settings
+
+
+class Subscription:
+    """
+    One listener's bounded queue of pre-encoded Server-Sent Events messages.
+    `dropped` is set when the broker gave up on it for falling behind.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+
+class EventBroker:
+    """
+    In-process pub/sub fan-out. Publishing never blocks: a subscriber whose
+    queue is full is dropped rather than slowing down the publisher or the
+    other subscribers, and is expected to reconnect and resync.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.dropped_subscribers = 0
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: dict):
+        if not self._subscribers:
+            return
+
+        # Encode once, share the same string with every subscriber
+        message = f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self._subscribers.discard(subscription)
+                self.dropped_subscribers += 1
+
+
+order_events = EventBroker(queue_size=settings.ORDER_STREAM_QUEUE_SIZE)
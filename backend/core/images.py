@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL.Image import DecompressionBombError
+
+from .config import settings
+
+# Longest edge in pixels for each variant; images are never upscaled
+IMAGE_VARIANTS = {"thumb": 160, "medium": 480, "full": 1200}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+class InvalidImage(ValueError):
+    """The upload could not be decoded as an image."""
+
+
+def partial_name(filename: str, render_id: str) -> str:
+    """
+    Where one render writes `filename` before renaming it into place. Unique
+    per render, so concurrent renders of the same image can't clobber each
+    other's half-written files.
+    """
+    return f".{filename}.{render_id}.part"
+
+
+def render_variants(source: str, dest_dir: str, stem: str, render_id: str) -> Dict[str, Dict[str, str]]:
+    """
+    Write every variant of `source` as WebP plus a JPEG (or PNG, for images
+    with transparency) fallback into `dest_dir`. Re-encoding drops EXIF and
+    other metadata; orientation is applied to the pixels first. Returns
+    {variant: {"webp": filename, "fallback": filename}}.
+
+    Raises InvalidImage if `source` can't be decoded; errors writing the
+    variants propagate as they are. Runs in a worker process, so it only
+    takes and returns plain values.
+    """
+    dest = Path(dest_dir)
+    try:
+        with Image.open(source) as opened:
+            # Animated images keep their first frame
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except (UnidentifiedImageError, DecompressionBombError, OSError, SyntaxError) as exc:
+        raise InvalidImage(str(exc)) from None
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = {}
+    for name, edge in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+
+        webp_name = f"{stem}_{name}.webp"
+        _save_atomic(resized, dest / webp_name, render_id, "WEBP", quality=WEBP_QUALITY, method=4)
+        if has_alpha:
+            fallback_name = f"{stem}_{name}.png"
+            _save_atomic(resized, dest / fallback_name, render_id, "PNG", optimize=True)
+        else:
+            fallback_name = f"{stem}_{name}.jpg"
+            _save_atomic(
+                resized, dest / fallback_name, render_id, "JPEG",
+                quality=JPEG_QUALITY, optimize=True, progressive=True,
+            )
+        variants[name] = {"webp": webp_name, "fallback": fallback_name}
+    return variants
+
+
+def _save_atomic(image: Image.Image, path: Path, render_id: str, image_format: str, **options):
+    """
+    Encode next to `path` and rename into place, so a served file is never
+    seen half-written. Concurrent renders of the same bytes produce the same
+    file, so whichever rename lands last is as good as the first.
+    """
+    partial = path.with_name(partial_name(path.name, render_id))
+    try:
+        image.save(partial, image_format, **options)
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+
+class ImageProcessor:
+    """
+    Runs image work in a process pool so resizing and encoding never block
+    the event loop. The pool is created on first use.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that already runs Motor's monitor threads and the
+            # bcrypt pool can copy a held lock into the worker; start clean ones
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def render_variants(
+        self, source: Path, dest_dir: Path, stem: str, render_id: str
+    ) -> Dict[str, Dict[str, str]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor(), render_variants, str(source), str(dest_dir), stem, render_id
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+image_processor = ImageProcessor(max_workers=settings.IMAGE_WORKERS)
@@ -0,0 +1,99 @@
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from .archive import ARCHIVE_INDEXES, archive_collection_names
+
+# Every index the application relies on, per collection. Names are explicit so
+# drift detection can match them against what the server reports.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "orders": [
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_keyset"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_created_at_keyset",
+        ),
+    ],
+    "menu_items": [
+        IndexModel([("category_id", ASCENDING)], name="category_id"),
+        # Reference counting for content-addressed images
+        IndexModel([("image_url", ASCENDING)], name="image_url"),
+    ],
+    "menu_item_stats": [
+        IndexModel([("ordered.d7", DESCENDING)], name="ordered_7d"),
+    ],
+    "menu_item_daily_stats": [
+        IndexModel([("day", ASCENDING)], name="day"),
+    ],
+}
+
+
+
+async def declared_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[IndexModel]]:
+    """
+    INDEXES plus the archive indexes for every existing monthly archive collection.
+    """
+    indexes = dict(INDEXES)
+    for name in await archive_collection_names(db):
+        indexes[name] = ARCHIVE_INDEXES
+    return indexes
+
+# Options that are part of an index definition (as opposed to build-time options)
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _spec(document: dict) -> dict:
+    spec = {"key": list(dict(document["key"]).items())}
+    for option in _COMPARED_OPTIONS:
+        if option in document:
+            spec[option] = document[option]
+    return spec
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> List[str]:
+    """
+    Create every declared index. Safe to run repeatedly: existing identical
+    indexes are left alone. Returns a list of failures (e.g. duplicate emails
+    preventing the unique index, or the server being unreachable) instead of
+    raising, so startup isn't blocked.
+    """
+    failures = []
+    for collection, indexes in (await declared_indexes(db)).items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except PyMongoError as exc:
+            failures.append(f"{collection}: {exc}")
+    return failures
+
+
+async def check_index_drift(db: AsyncIOMotorDatabase) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare the declared indexes with the ones on the server. Returns, per
+    collection, the names of indexes that are missing, defined differently
+    or present on the server but not declared. Collections without drift
+    are omitted.
+    """
+    report = {}
+    for collection, indexes in (await declared_indexes(db)).items():
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+
+        drift = {"missing": [], "mismatched": [], "unexpected": []}
+        for index in indexes:
+            name = index.document["name"]
+            if name not in existing:
+                drift["missing"].append(name)
+            elif _spec(index.document) != _spec(existing[name]):
+                drift["mismatched"].append(name)
+
+        declared = {index.document["name"] for index in indexes}
+        drift["unexpected"] = sorted(set(existing) - declared)
+
+        if any(drift.values()):
+            report[collection] = drift
+    return report
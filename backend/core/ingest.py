@@ -0,0 +1,157 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from .config import settings
+from .order_changes import publish_order_event, record_changes
+
+
+class IngestQueueFull(Exception):
+    """Raised when the ingestion buffer can't take more documents right now."""
+
+
+class WriteBehindBuffer:
+    """
+    Micro-batching insert buffer for one collection. Callers hand over a
+    document and await its insertion; a background task groups everything
+    queued within `max_delay_ms` (or up to `batch_size` documents) into a
+    single insert_many(ordered=False).
+
+    `after_insert`, if given, is called with the documents of each batch that
+    were written, after their callers have been answered. Follow-up work
+    that should happen once per document (counters, events) belongs there:
+    it then costs one round trip per batch, and still happens if a caller
+    has gone away in the meantime.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        batch_size: int,
+        max_delay_ms: int,
+        queue_size: int,
+        after_insert: Optional[Callable[[AsyncIOMotorDatabase, List[dict]], Awaitable[None]]] = None,
+    ):
+        self.collection_name = collection_name
+        self.after_insert = after_insert
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self._db = db
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def drain(self):
+        """
+        Stop accepting documents, wait for everything queued to be written,
+        then stop the background task.
+        """
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        await self._queue.join()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def insert(self, document: dict) -> dict:
+        """
+        Queue `document` for insertion and return it with its `_id` once written.
+        Raises IngestQueueFull instead of waiting when the buffer is full.
+        """
+        if not self.running:
+            raise IngestQueueFull("Ingestion buffer is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((document, future))
+        except asyncio.QueueFull:
+            raise IngestQueueFull(f"More than {self.queue_size} documents waiting to be written")
+
+        inserted_id = await future
+        return {**document, "_id": inserted_id}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        documents = [document for document, _ in batch]
+        failed = {}
+        try:
+            await self._db[self.collection_name].insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            failed = {error["index"]: error for error in exc.details.get("writeErrors", [])}
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        # insert_many assigns `_id` on each document in place
+        inserted = []
+        for index, (document, future) in enumerate(batch):
+            if index in failed:
+                if not future.done():
+                    future.set_exception(OperationFailure(failed[index].get("errmsg"), failed[index].get("code")))
+                continue
+            inserted.append(document)
+            # A caller that went away has a cancelled future; the document is written all the same
+            if not future.done():
+                future.set_result(document["_id"])
+
+        if inserted and self.after_insert:
+            try:
+                await self.after_insert(self._db, inserted)
+            except Exception as exc:
+                print(f"Post-insert processing for {self.collection_name} failed: {exc}")
+
+
+async def _orders_inserted(db: AsyncIOMotorDatabase, orders: List[dict]):
+    """Rollups, sales counters and order.created events for a batch of new orders"""
+    await record_changes(db, [(None, order) for order in orders])
+    for order in orders:
+        publish_order_event("order.created", order)
+
+
+order_ingest = WriteBehindBuffer(
+    "orders",
+    after_insert=_orders_inserted,
+    batch_size=settings.ORDER_INGEST_BATCH_SIZE,
+    max_delay_ms=settings.ORDER_INGEST_MAX_DELAY_MS,
+    queue_size=settings.ORDER_INGEST_QUEUE_SIZE,
+)
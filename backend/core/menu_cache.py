@@ -0,0 +1,71 @@
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from .catalog import MenuCatalog, menu_catalog
+from .config import settings
+from .serialization import FastJSONResponse
+
+
+class MenuResponseCache:
+    """
+    Serialized public menu responses, keyed by the menu version and the
+    request parameters, each with a strong ETag.
+
+    The version is the catalog's: every write in menu_routes invalidates the
+    catalog, which drops all cached bodies. Entries also expire with the
+    catalog TTL so writes made through another worker show up in time.
+    """
+
+    def __init__(self, catalog: MenuCatalog, ttl_seconds: float, max_entries: int = 1024):
+        self.catalog = catalog
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._version = catalog.version
+        self._entries: Dict[Hashable, Tuple[bytes, str, float]] = {}
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[bytes, str, float]]:
+        if self._version != self.catalog.version:
+            self._version = self.catalog.version
+            self._entries.clear()
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[2] < self.ttl_seconds:
+            return entry
+        return None
+
+    @staticmethod
+    def _matches(request: Request, etag: str) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    async def respond(self, request: Request, key: Hashable, build: Callable[[], Awaitable[Any]]) -> Response:
+        """
+        Serve `key` from the cache, calling `build` for the content on a miss.
+        Answers 304 when the client already holds the current body.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            version = self.catalog.version
+            content = await build()
+            body = FastJSONResponse(content).body
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            entry = (body, etag, time.monotonic())
+            # Don't keep a body that a concurrent write has already made stale
+            if version == self.catalog.version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = entry
+
+        body, etag, _ = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self._matches(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+menu_responses = MenuResponseCache(menu_catalog, ttl_seconds=settings.MENU_CATALOG_TTL_SECONDS)
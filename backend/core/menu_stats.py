@@ -0,0 +1,186 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from models.pos_models import OrderStatus
+
+from .archive import order_collection_names
+
+STATS_COLLECTION = "menu_item_stats"
+DAILY_COLLECTION = "menu_item_daily_stats"
+
+# Rolling windows kept on each menu_item_stats document, in days
+WINDOWS = {"d1": 1, "d7": 7, "d30": 30}
+METRICS = ("ordered", "sold", "revenue")
+POPULARITY_FIELD = "ordered.d7"
+
+_last_rolled: Optional[datetime] = None
+
+
+def _day(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def _contribution(order: Optional[dict]) -> Dict[tuple, float]:
+    """
+    What one order adds to the counters, keyed by (menu_item_id, day, metric).
+    Units count as ordered on the day the order was placed unless it was
+    cancelled, and as sold (with revenue) on the day it was paid.
+    """
+    counters = defaultdict(int)
+    if not order:
+        return counters
+    payment = order.get("payment")
+    for item in order.get("items") or []:
+        menu_item_id = item["menu_item_id"]
+        if order.get("status") != OrderStatus.CANCELLED:
+            counters[(menu_item_id, _day(order["created_at"]), "ordered")] += item["quantity"]
+        if payment:
+            paid_day = _day(payment["paid_at"])
+            counters[(menu_item_id, paid_day, "sold")] += item["quantity"]
+            counters[(menu_item_id, paid_day, "revenue")] += item.get("subtotal", 0)
+    return counters
+
+
+async def record_menu_item_changes(db: AsyncIOMotorDatabase, changes: List[tuple]):
+    """
+    Apply the difference between each (before, after) pair of order documents
+    (either may be None) to the daily buckets, the lifetime totals and every
+    rolling window the affected day still falls into. One bulk write per
+    collection for the whole batch.
+    """
+    today = _day(datetime.utcnow())
+    daily = defaultdict(lambda: defaultdict(int))
+    totals = defaultdict(lambda: defaultdict(int))
+
+    for before, after in changes:
+        delta = _contribution(after)
+        for key, value in _contribution(before).items():
+            delta[key] -= value
+        for (menu_item_id, day, metric), value in delta.items():
+            if not value:
+                continue
+            age = (today - day).days
+            daily[(menu_item_id, day)][metric] += value
+            totals[menu_item_id][f"{metric}.lifetime"] += value
+            for window, days in WINDOWS.items():
+                if age < days:
+                    totals[menu_item_id][f"{metric}.{window}"] += value
+
+    daily_updates = [
+        UpdateOne(
+            {"_id": f"{menu_item_id}:{day:%Y-%m-%d}"},
+            {"$inc": dict(inc), "$setOnInsert": {"menu_item_id": menu_item_id, "day": day}},
+            upsert=True,
+        )
+        for (menu_item_id, day), inc in daily.items()
+    ]
+    total_updates = [
+        UpdateOne({"_id": menu_item_id}, {"$inc": dict(inc)}, upsert=True)
+        for menu_item_id, inc in totals.items()
+    ]
+    writes = []
+    if daily_updates:
+        writes.append(db[DAILY_COLLECTION].bulk_write(daily_updates, ordered=False))
+    if total_updates:
+        writes.append(db[STATS_COLLECTION].bulk_write(total_updates, ordered=False))
+    await asyncio.gather(*writes)
+
+
+async def record_menu_item_change(db: AsyncIOMotorDatabase, before: Optional[dict], after: Optional[dict]):
+    """
+    Single-order form of record_menu_item_changes.
+    """
+    await record_menu_item_changes(db, [(before, after)])
+
+
+async def roll_windows(db: AsyncIOMotorDatabase, force: bool = False):
+    """
+    Recompute the rolling windows from the daily buckets so days that have
+    aged out stop counting. Cheap (at most 30 days × menu size documents) and
+    only done once per UTC day per process unless `force` is set.
+    """
+    global _last_rolled
+    today = _day(datetime.utcnow())
+    if not force and _last_rolled == today:
+        return
+    _last_rolled = today
+
+    since = today - timedelta(days=max(WINDOWS.values()) - 1)
+    group = {"_id": "$menu_item_id"}
+    for metric in METRICS:
+        for window, days in WINDOWS.items():
+            start = today - timedelta(days=days - 1)
+            group[f"{metric}_{window}"] = {
+                "$sum": {"$cond": [{"$gte": ["$day", start]}, f"${metric}", 0]}
+            }
+    rows = await db[DAILY_COLLECTION].aggregate([
+        {"$match": {"day": {"$gte": since}}},
+        {"$group": group},
+    ]).to_list(None)
+
+    zeroes = {f"{metric}.{window}": 0 for metric in METRICS for window in WINDOWS}
+    updates = [
+        UpdateOne(
+            {"_id": row["_id"]},
+            {"$set": {f"{metric}.{window}": row.get(f"{metric}_{window}", 0) for metric in METRICS for window in WINDOWS}},
+            upsert=True,
+        )
+        for row in rows
+    ]
+    # Items with no sales in the last 30 days drop to zero in every window
+    await db[STATS_COLLECTION].update_many({"_id": {"$nin": [row["_id"] for row in rows]}}, {"$set": zeroes})
+    if updates:
+        await db[STATS_COLLECTION].bulk_write(updates, ordered=False)
+    # Buckets older than the widest window are no longer needed
+    await db[DAILY_COLLECTION].delete_many({"day": {"$lt": since}})
+
+
+async def popularity_ranking(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    """
+    Menu item id → rank (0 = most ordered over the last 7 days), read
+    through the index on the popularity field.
+    """
+    await roll_windows(db)
+    stats = await db[STATS_COLLECTION].find({}, {"_id": 1}).sort(POPULARITY_FIELD, -1).to_list(None)
+    return {doc["_id"]: rank for rank, doc in enumerate(stats)}
+
+
+async def rebuild_menu_item_stats(db: AsyncIOMotorDatabase) -> int:
+    """
+    Recompute every counter from the orders collection and its archives, then
+    roll the windows. Used to backfill existing data or repair drift; returns
+    the number of orders scanned.
+    """
+    since = _day(datetime.utcnow()) - timedelta(days=max(WINDOWS.values()) - 1)
+    daily = defaultdict(lambda: defaultdict(int))
+    lifetime = defaultdict(lambda: defaultdict(int))
+    scanned = 0
+    projection = {"items.menu_item_id": 1, "items.quantity": 1, "items.subtotal": 1,
+                  "status": 1, "payment": 1, "created_at": 1}
+    for collection in await order_collection_names(db):
+        async for order in db[collection].find({}, projection):
+            scanned += 1
+            for (menu_item_id, day, metric), value in _contribution(order).items():
+                lifetime[menu_item_id][metric] += value
+                if day >= since:
+                    daily[(menu_item_id, day)][metric] += value
+
+    await db[DAILY_COLLECTION].delete_many({})
+    await db[STATS_COLLECTION].delete_many({})
+    if daily:
+        await db[DAILY_COLLECTION].insert_many([
+            {"_id": f"{menu_item_id}:{day:%Y-%m-%d}", "menu_item_id": menu_item_id, "day": day, **counters}
+            for (menu_item_id, day), counters in daily.items()
+        ])
+    if lifetime:
+        await db[STATS_COLLECTION].insert_many([
+            {"_id": menu_item_id, **{metric: {"lifetime": counters.get(metric, 0)} for metric in METRICS}}
+            for menu_item_id, counters in lifetime.items()
+        ])
+    await roll_windows(db, force=True)
+    return scanned
@@ -0,0 +1,39 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from models.pos_models import Order
+
+from .events import order_events
+from .menu_stats import record_menu_item_changes
+from .order_stats import record_order_changes
+from .serialization import document_to_dict
+
+
+async def record_changes(db: AsyncIOMotorDatabase, changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Apply committed order writes to the rollups and the menu item counters,
+    concurrently. By the time this runs the orders themselves are saved, so
+    a failure here is logged instead of failing the request: the client
+    would retry and create or apply the order twice. Run
+    /api/orders/stats/rebuild to repair any drift.
+    """
+    if not changes:
+        return
+    results = await asyncio.gather(
+        record_order_changes(db, changes),
+        record_menu_item_changes(db, changes),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, PyMongoError):
+            print(f"Recording order statistics failed, rebuild them to repair: {result}")
+        elif isinstance(result, BaseException):
+            raise result
+
+
+def publish_order_event(event_type: str, order: dict):
+    order_events.publish(event_type, {"type": event_type, "order": jsonable_encoder(document_to_dict(Order, order))})
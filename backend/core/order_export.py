@@ -0,0 +1,132 @@
+import csv
+import heapq
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .archive import collection_overlaps, naive_utc, order_collection_names
+
+EXPORT_BATCH_SIZE = 500
+
+# One row per order line item, with the order's fields repeated
+EXPORT_COLUMNS = [
+    "order_id", "created_at", "status", "table_number", "customer_name", "total_amount",
+    "payment_method", "payment_amount", "paid_at",
+    "menu_item_id", "item_name", "quantity", "size", "addons", "price_per_item", "subtotal",
+    "special_instructions",
+]
+
+
+async def _next_or_none(cursor) -> Optional[dict]:
+    try:
+        return await cursor.next()
+    except StopAsyncIteration:
+        return None
+
+
+async def _merge_by_created_at(cursors: List) -> AsyncIterator[dict]:
+    """
+    Merge cursors that are each sorted by (created_at, _id) into one ordered stream,
+    holding only one document per cursor at a time.
+    """
+    heap = []
+    for position, cursor in enumerate(cursors):
+        doc = await _next_or_none(cursor)
+        if doc:
+            heap.append((doc["created_at"], doc["_id"], position, doc))
+    heapq.heapify(heap)
+
+    while heap:
+        _, _, position, doc = heapq.heappop(heap)
+        yield doc
+        following = await _next_or_none(cursors[position])
+        if following:
+            heapq.heappush(heap, (following["created_at"], following["_id"], position, following))
+
+
+def _flatten(order: dict, item_names: Dict[str, str]) -> List[dict]:
+    payment = order.get("payment") or {}
+    base = {
+        "order_id": str(order["_id"]),
+        "created_at": order["created_at"].isoformat(),
+        "status": order["status"],
+        "table_number": order.get("table_number"),
+        "customer_name": order.get("customer_name"),
+        "total_amount": order["total_amount"],
+        "payment_method": payment.get("method"),
+        "payment_amount": payment.get("amount"),
+        "paid_at": payment["paid_at"].isoformat() if payment.get("paid_at") else None,
+    }
+    rows = []
+    for item in order.get("items", []):
+        rows.append({
+            **base,
+            "menu_item_id": item["menu_item_id"],
+            "item_name": item_names.get(item["menu_item_id"]),
+            "quantity": item["quantity"],
+            "size": (item.get("size") or {}).get("name"),
+            "addons": "; ".join(addon["name"] for addon in item.get("addons", [])),
+            "price_per_item": item["price_per_item"],
+            "subtotal": item["subtotal"],
+            "special_instructions": item.get("special_instructions"),
+        })
+    return rows
+
+
+async def iter_export_rows(
+    db: AsyncIOMotorDatabase,
+    item_names: Dict[str, str],
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> AsyncIterator[dict]:
+    """
+    Flattened line items of every order (hot and archived) created in the
+    range, oldest first. Documents are pulled from the cursors in batches of
+    EXPORT_BATCH_SIZE, so memory use doesn't depend on the size of the range.
+    """
+    created_from, created_to = naive_utc(created_from), naive_utc(created_to)
+    query = {}
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+
+    cursors = [
+        db[name].find(query).sort([("created_at", 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+        for name in await order_collection_names(db)
+        if collection_overlaps(name, created_from, created_to)
+    ]
+    async for order in _merge_by_created_at(cursors):
+        for row in _flatten(order, item_names):
+            yield row
+
+
+async def ndjson_chunks(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def csv_chunks(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    async for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
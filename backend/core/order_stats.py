@@ -0,0 +1,139 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from models.pos_models import ACTIVE_ORDER_STATUSES, OrderStatus
+
+from .archive import order_collection_names
+
+ROLLUP_COLLECTION = "order_rollups"
+TOTAL_BUCKET = "all"
+
+
+def _status_value(value) -> str:
+    return value.value if isinstance(value, OrderStatus) else value
+
+
+def day_bucket(moment: datetime) -> str:
+    return f"day:{moment:%Y-%m-%d}"
+
+
+def hour_bucket(moment: datetime) -> str:
+    return f"hour:{moment:%Y-%m-%dT%H}"
+
+
+def _contribution(order: Optional[dict]) -> Counter:
+    """
+    Counters a single order adds to the rollups of the period it was created in.
+    Revenue mirrors the dashboard: paid orders that are completed.
+    """
+    counters = Counter()
+    if not order:
+        return counters
+
+    order_status = _status_value(order["status"])
+    counters["orders"] += 1
+    counters[f"by_status.{order_status}"] += 1
+
+    payment = order.get("payment")
+    if payment and order_status == OrderStatus.COMPLETED.value:
+        counters["paid_orders"] += 1
+        counters["revenue"] += payment["amount"]
+    return counters
+
+
+async def record_order_changes(db: AsyncIOMotorDatabase, changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Apply the difference between the (before, after) versions of any number of
+    orders to the lifetime, day and hour rollups in one bulk write. Use
+    `before=None` for newly created orders.
+    """
+    per_bucket = {}
+    for before, after in changes:
+        delta = _contribution(after)
+        delta.subtract(_contribution(before))
+        created_at = (after or before)["created_at"]
+        for bucket in (TOTAL_BUCKET, day_bucket(created_at), hour_bucket(created_at)):
+            per_bucket.setdefault(bucket, Counter()).update(delta)
+
+    updates = []
+    for bucket, delta in per_bucket.items():
+        inc = {key: value for key, value in delta.items() if value}
+        if inc:
+            updates.append(UpdateOne({"_id": bucket}, {"$inc": inc}, upsert=True))
+    if updates:
+        await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+
+
+async def record_order_change(db: AsyncIOMotorDatabase, before: Optional[dict], after: Optional[dict]):
+    """
+    Single-order form of record_order_changes.
+    """
+    await record_order_changes(db, [(before, after)])
+
+
+def _stats_from_rollup(bucket: str, doc: Optional[dict]) -> dict:
+    doc = doc or {}
+    by_status = {s.value: doc.get("by_status", {}).get(s.value, 0) for s in OrderStatus}
+    return {
+        "period": bucket,
+        "total_orders": doc.get("orders", 0),
+        "completed": by_status[OrderStatus.COMPLETED.value],
+        "in_progress": sum(by_status[s.value] for s in ACTIVE_ORDER_STATUSES),
+        "cancelled": by_status[OrderStatus.CANCELLED.value],
+        "paid_orders": doc.get("paid_orders", 0),
+        "revenue": round(doc.get("revenue", 0), 2),
+        "by_status": by_status,
+    }
+
+
+async def get_order_stats(db: AsyncIOMotorDatabase, day: Optional[datetime] = None) -> dict:
+    """
+    Read precomputed statistics: lifetime totals, or a single day with its hourly
+    breakdown. Costs one indexed read regardless of how many orders exist.
+    """
+    if day is None:
+        doc = await db[ROLLUP_COLLECTION].find_one({"_id": TOTAL_BUCKET})
+        return _stats_from_rollup(TOTAL_BUCKET, doc)
+
+    bucket = day_bucket(day)
+    hour_buckets = [hour_bucket(day.replace(hour=hour)) for hour in range(24)]
+    docs = await db[ROLLUP_COLLECTION].find({"_id": {"$in": [bucket] + hour_buckets}}).to_list(None)
+    by_id = {doc["_id"]: doc for doc in docs}
+
+    stats = _stats_from_rollup(bucket, by_id.get(bucket))
+    stats["hourly"] = [_stats_from_rollup(b, by_id[b]) for b in hour_buckets if b in by_id]
+    return stats
+
+
+async def rebuild_order_rollups(db: AsyncIOMotorDatabase) -> int:
+    """
+    Recompute every rollup from the orders collection and its archives. Used to
+    backfill existing data or repair drift; returns the number of orders scanned.
+    """
+    totals = {}
+    scanned = 0
+    projection = {"status": 1, "payment": 1, "created_at": 1}
+    for collection in await order_collection_names(db):
+        async for order in db[collection].find({}, projection):
+            scanned += 1
+            contribution = _contribution(order)
+            created_at = order["created_at"]
+            for bucket in (TOTAL_BUCKET, day_bucket(created_at), hour_bucket(created_at)):
+                totals.setdefault(bucket, Counter()).update(contribution)
+
+    await db[ROLLUP_COLLECTION].delete_many({})
+    if totals:
+        docs = []
+        for bucket, counters in totals.items():
+            doc = {"_id": bucket, "orders": counters["orders"], "paid_orders": counters["paid_orders"],
+                   "revenue": counters["revenue"], "by_status": {}}
+            for key, value in counters.items():
+                if key.startswith("by_status."):
+                    doc["by_status"][key.split(".", 1)[1]] = value
+            docs.append(doc)
+        await db[ROLLUP_COLLECTION].insert_many(docs)
+    return scanned
@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+
+# Newest first; _id breaks ties between documents created in the same millisecond
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    """
+    Build an opaque cursor pointing just past `doc` in KEYSET_SORT order.
+    """
+    raw = json.dumps({"t": doc["created_at"].isoformat(), "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Inverse of encode_cursor. Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_filter(cursor: str) -> dict:
+    created_at, obj_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": obj_id}},
+        ]
+    }
+
+
+def split_page(docs: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    Given up to `limit + 1` documents, return the page and the cursor for the next one.
+    """
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from models.user_models import User
+
+from .config import settings
+
+PrincipalKey = Tuple[str, Optional[int]]
+
+_ABANDONED = object()
+
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of authenticated users, keyed by the token's
+    subject and issue time (`iat`).
+
+    Concurrent misses for the same key share one load (single flight), so a
+    burst of requests from one terminal costs at most one user lookup.
+    invalidate() drops every entry for a subject; call it whenever a user's
+    role or password changes. Other workers pick up such changes within
+    the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that waited for a lookup already in flight
+        self._entries: "OrderedDict[PrincipalKey, Tuple[User, float]]" = OrderedDict()
+        self._loading: Dict[PrincipalKey, asyncio.Future] = {}
+        # Bumped per subject on invalidation so an in-flight load can't store a stale user
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: PrincipalKey, load: Callable[[], Awaitable[Optional[User]]]) -> Optional[User]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            user, loaded_at = entry
+            if time.monotonic() - loaded_at < self.ttl_seconds:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return user
+            del self._entries[key]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            user = await asyncio.shield(pending)
+            if user is _ABANDONED:
+                return await self.get(key, load)
+            return user
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generations.get(key[0], 0)
+        try:
+            user = await load()
+        except asyncio.CancelledError:
+            # The loading request went away; anyone waiting on it loads for themselves
+            future.set_result(_ABANDONED)
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; retrieve it here so an unawaited future doesn't warn
+            future.exception()
+            raise
+        else:
+            future.set_result(user)
+            # Unknown users aren't cached, so a new account works straight away
+            if user is not None and generation == self._generations.get(key[0], 0):
+                self._entries[key] = (user, time.monotonic())
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return user
+        finally:
+            del self._loading[key]
+
+    def invalidate(self, subject: str):
+        self._generations[subject] = self._generations.get(subject, 0) + 1
+        for key in [key for key in self._entries if key[0] == subject]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_SIZE,
+)
@@ -0,0 +1,238 @@
+import ipaddress
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `burst` tokens, refilled at `rate` per second.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take one token. Returns 0 on success, otherwise how many seconds
+        until a token will be available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class RateLimitRule:
+    """
+    Limits for requests matching `method` and `path`. Each principal (user,
+    or client address when anonymous) gets its own bucket, and the route as
+    a whole can have a shared one. Heavy routes also count against the
+    global in-flight limit.
+    """
+    name: str
+    method: str
+    path: Pattern
+    per_principal: Tuple[float, float]  # (tokens per second, burst)
+    per_route: Optional[Tuple[float, float]] = None
+    heavy: bool = False
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method == "*" or self.method == method) and self.path.match(path) is not None
+
+
+def _rule(name: str, method: str, path: str, per_principal, per_route=None, heavy=False) -> RateLimitRule:
+    return RateLimitRule(name, method, re.compile(path), per_principal, per_route, heavy)
+
+
+# First match wins; the last rule is the general allowance for the whole API
+DEFAULT_RULES: List[RateLimitRule] = [
+    # Login is keyed by address, and a restaurant's staff often share one NAT address, so
+    # its per-address allowance is generous; per_route and the hasher queue cap bound the cost
+    _rule("login", "POST", r"^/api/auth/token$", per_principal=(1 / 2, 60), per_route=(20, 40), heavy=True),
+    _rule("register", "POST", r"^/api/auth/register$", per_principal=(1 / 60, 5), per_route=(5, 10), heavy=True),
+    _rule("create_order", "POST", r"^/api/orders$", per_principal=(5, 20), heavy=True),
+    _rule("bulk_orders", "POST", r"^/api/orders/bulk$", per_principal=(1, 5), heavy=True),
+    _rule("order_export", "GET", r"^/api/orders/export$", per_principal=(1 / 10, 2), heavy=True),
+    _rule("order_maintenance", "POST", r"^/api/orders/(archive|stats/rebuild)$", per_principal=(1 / 60, 2), heavy=True),
+    _rule("reports", "GET", r"^/api/reports/", per_principal=(1, 10), heavy=True),
+    _rule("upload_image", "POST", r"^/api/menu/upload-image$", per_principal=(1, 5), heavy=True),
+    _rule("api", "*", r"^/api/", per_principal=(50, 100)),
+]
+
+
+class RateLimiter:
+    """
+    Token buckets per rule and principal, plus a cap on how many heavy
+    requests may run at once. Keeps counts of rejections for metrics.
+    """
+
+    def __init__(
+        self,
+        rules: List[RateLimitRule],
+        heavy_max_in_flight: int,
+        trusted_proxies: List[ipaddress._BaseNetwork] = (),
+        max_buckets: int = 10000,
+    ):
+        self.rules = rules
+        self.trusted_proxies = list(trusted_proxies)
+        self.heavy_max_in_flight = heavy_max_in_flight
+        self.max_buckets = max_buckets
+        self.heavy_in_flight = 0
+        self.rejected: Dict[Tuple[str, str], int] = {}
+        # Least recently used first, so the oldest bucket is evicted when full
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    def _bucket(self, key: Tuple[str, str], limits: Tuple[float, float], now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = TokenBucket(limits[0], limits[1], now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check(self, rule: RateLimitRule, principal: str) -> float:
+        """
+        Returns 0 if the request may proceed, otherwise the seconds to wait.
+        """
+        now = time.monotonic()
+        waits = [self._bucket((rule.name, principal), rule.per_principal, now).take(now)]
+        if rule.per_route and not waits[0]:
+            waits.append(self._bucket((rule.name, "*"), rule.per_route, now).take(now))
+        wait = max(waits)
+        if wait:
+            self._count_rejection(rule, "rate")
+        return wait
+
+    def _count_rejection(self, rule: RateLimitRule, reason: str):
+        key = (rule.name, reason)
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "heavy_in_flight": self.heavy_in_flight,
+            "buckets": len(self._buckets),
+            "rejected": {f"{rule}:{reason}": count for (rule, reason), count in self.rejected.items()},
+        }
+
+
+def parse_trusted_proxies(value: str) -> List[ipaddress._BaseNetwork]:
+    """
+    Comma separated addresses or CIDR ranges of the proxies allowed to set X-Real-IP.
+    """
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in value.split(",") if entry.strip()]
+
+
+def _client_address(headers: Headers, scope: Scope, trusted_proxies: List[ipaddress._BaseNetwork]) -> str:
+    """
+    The socket peer, unless it is a trusted proxy (nginx), in which case the
+    address it forwarded in X-Real-IP. Anyone else could forge the header.
+    """
+    peer = (scope.get("client") or ("unknown",))[0]
+    forwarded = headers.get("x-real-ip")
+    if forwarded and trusted_proxies:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return peer
+        if any(address in network for network in trusted_proxies):
+            return forwarded
+    return peer
+
+
+def _principal(headers: Headers, scope: Scope, trusted_proxies: List[ipaddress._BaseNetwork]) -> str:
+    """
+    The user a request is made by (verified token subject), or the client
+    address for anonymous requests and invalid tokens.
+    """
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{_client_address(headers, scope, trusted_proxies)}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a RateLimiter. Rejected requests get an
+    immediate 429 with Retry-After, before any route code runs.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: "RateLimiter"):
+        self.app = app
+        self.limiter = limiter
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, detail: str, retry_after: float):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        rule = limiter.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = limiter.check(rule, _principal(Headers(scope=scope), scope, limiter.trusted_proxies))
+        if wait:
+            await self._reject(scope, receive, send, "Too many requests, please slow down", wait)
+            return
+
+        if not rule.heavy:
+            await self.app(scope, receive, send)
+            return
+
+        if limiter.heavy_in_flight >= limiter.heavy_max_in_flight:
+            limiter._count_rejection(rule, "concurrency")
+            await self._reject(scope, receive, send, "Server is busy, please retry", 1)
+            return
+        limiter.heavy_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.heavy_in_flight -= 1
+
+
+rate_limiter = RateLimiter(
+    DEFAULT_RULES,
+    heavy_max_in_flight=settings.RATE_LIMIT_HEAVY_MAX_IN_FLIGHT,
+    trusted_proxies=parse_trusted_proxies(settings.RATE_LIMIT_TRUSTED_PROXIES),
+)
@@ -0,0 +1,54 @@
+from typing import Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+# Write helpers that hand back the resulting document from the write itself,
+# so routes never need a follow-up find_one to build their response.
+
+
+async def insert_document(collection: AsyncIOMotorCollection, document: dict) -> dict:
+    """
+    Insert `document` and return it with its generated `_id`.
+    """
+    result = await collection.insert_one(document)
+    return {**document, "_id": result.inserted_id}
+
+
+def _update_spec(fields: dict, inc: Optional[dict]) -> dict:
+    update = {"$set": fields}
+    if inc:
+        update["$inc"] = inc
+    return update
+
+
+async def update_document(
+    collection: AsyncIOMotorCollection, query: dict, fields: dict, inc: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    `$set` `fields` (and `$inc` `inc`) on the first document matching `query`
+    and return the updated document, or None if nothing matched.
+    """
+    return await collection.find_one_and_update(
+        query, _update_spec(fields, inc), return_document=ReturnDocument.AFTER
+    )
+
+
+async def update_document_with_previous(
+    collection: AsyncIOMotorCollection, query: dict, fields: dict, inc: Optional[dict] = None
+) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Like update_document, but return both the previous and the updated
+    document (None, None if nothing matched). Still a single round trip: the
+    server returns the previous version and the update is replayed locally.
+    """
+    previous = await collection.find_one_and_update(
+        query, _update_spec(fields, inc), return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        return None, None
+
+    updated = {**previous, **fields}
+    for key, amount in (inc or {}).items():
+        updated[key] = previous.get(key, 0) + amount
+    return previous, updated
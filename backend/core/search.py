@@ -0,0 +1,278 @@
+import asyncio
+import heapq
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.pos_models import MenuItem
+
+from .catalog import MenuCatalog, menu_catalog
+from .config import settings
+from .serialization import document_to_dict
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+# How much a hit in each field counts towards an item's score
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+# How much each kind of term match counts, relative to an exact one
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.4
+MAX_CACHED_QUERIES = 1024
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def max_typos(token: str) -> int:
+    if len(token) >= 8:
+        return 2
+    if len(token) >= 4:
+        return 1
+    return 0
+
+
+class _TrieNode:
+    __slots__ = ("children", "term")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.term: Optional[str] = None
+
+
+class MenuSearchIndex:
+    """
+    In-process full-text index over menu item names, descriptions and category
+    names: an inverted index from term to weighted item ids, plus a trie of
+    the terms for prefix and typo-tolerant (Levenshtein) lookups.
+
+    Built from the menu catalog on first use and kept current by the menu
+    routes through upsert/remove calls. Rebuilt when older than the catalog
+    TTL so writes handled by another worker show up.
+    """
+
+    def __init__(self, catalog: MenuCatalog, ttl_seconds: float):
+        self.catalog = catalog
+        self.ttl_seconds = ttl_seconds
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._root = _TrieNode()
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._item_terms: Dict[str, Dict[str, float]] = {}
+        self._items: Dict[str, dict] = {}
+        self._docs: Dict[str, dict] = {}
+        self._categories: Dict[str, str] = {}
+        self._results: Dict[tuple, List[dict]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    # ----- index maintenance -----
+
+    def _add_term(self, term: str):
+        node = self._root
+        for ch in term:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.term = term
+
+    def _remove_term(self, term: str):
+        node = self._root
+        for ch in term:
+            node = node.children.get(ch)
+            if node is None:
+                return
+        node.term = None
+
+    def _index_item(self, item_id: str):
+        self._results.clear()
+        doc = self._docs[item_id]
+        terms: Dict[str, float] = {}
+        fields = {
+            "name": doc.get("name"),
+            "category": self._categories.get(doc.get("category_id")),
+            "description": doc.get("description"),
+        }
+        for field, text in fields.items():
+            for term in tokenize(text):
+                terms[term] = max(terms.get(term, 0.0), FIELD_WEIGHTS[field])
+        for term, weight in terms.items():
+            if term not in self._postings:
+                self._add_term(term)
+            self._postings[term][item_id] = weight
+        self._item_terms[item_id] = terms
+        self._items[item_id] = document_to_dict(MenuItem, doc)
+
+    def _unindex_item(self, item_id: str):
+        self._results.clear()
+        for term in self._item_terms.pop(item_id, {}):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(item_id, None)
+            if not postings:
+                del self._postings[term]
+                self._remove_term(term)
+        self._items.pop(item_id, None)
+
+    def upsert_item(self, doc: dict):
+        if not self.loaded:
+            return
+        item_id = str(doc["_id"])
+        self._unindex_item(item_id)
+        self._docs[item_id] = doc
+        self._index_item(item_id)
+
+    def remove_item(self, item_id: str):
+        if not self.loaded:
+            return
+        self._unindex_item(item_id)
+        self._docs.pop(item_id, None)
+
+    def _reindex_category(self, category_id: str):
+        for item_id, doc in self._docs.items():
+            if doc.get("category_id") == category_id:
+                self._unindex_item(item_id)
+                self._index_item(item_id)
+
+    def upsert_category(self, doc: dict):
+        if not self.loaded:
+            return
+        category_id = str(doc["_id"])
+        self._categories[category_id] = doc.get("name")
+        self._reindex_category(category_id)
+
+    def remove_category(self, category_id: str):
+        if not self.loaded:
+            return
+        self._categories.pop(category_id, None)
+        self._reindex_category(category_id)
+
+    async def ensure_loaded(self, db: AsyncIOMotorDatabase):
+        if self.loaded and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        async with self._lock:
+            if self.loaded and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            version = self.catalog.version
+            items = await self.catalog.get_items(db)
+            categories = await db.categories.find({}, {"name": 1}).to_list(None)
+
+            self._reset()
+            self._categories = {str(cat["_id"]): cat.get("name") for cat in categories}
+            self._docs = dict(items)
+            for item_id in self._docs:
+                self._index_item(item_id)
+            # A menu write during the load may be missing; retry on the next query
+            self._loaded_at = time.monotonic() if version == self.catalog.version else float("-inf")
+
+    # ----- lookups -----
+
+    @staticmethod
+    def _terms_under(node: _TrieNode) -> List[str]:
+        terms, stack = [], [node]
+        while stack:
+            node = stack.pop()
+            if node.term is not None:
+                terms.append(node.term)
+            stack.extend(node.children.values())
+        return terms
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return self._terms_under(node)
+
+    def _fuzzy_terms(self, word: str, max_distance: int, prefix: bool) -> Dict[str, int]:
+        """
+        Terms within `max_distance` edits of `word` (or, with `prefix`, terms
+        starting with something that close), walking the trie with one
+        Levenshtein row per node and pruning branches that can't get closer.
+        Like most spellers it trusts the first letter, which keeps the walk
+        to one branch of the trie.
+        """
+        found: Dict[str, int] = {}
+        first = self._root.children.get(word[0])
+        if first is None:
+            return found
+        stack = [(first, word[0], list(range(len(word) + 1)))]
+        while stack:
+            node, ch, previous = stack.pop()
+            row = [previous[0] + 1]
+            for i in range(1, len(word) + 1):
+                row.append(min(
+                    row[i - 1] + 1,
+                    previous[i] + 1,
+                    previous[i - 1] + (word[i - 1] != ch),
+                ))
+            distance = row[-1]
+            if distance <= max_distance:
+                for term in self._terms_under(node) if prefix else [node.term] if node.term else []:
+                    if distance < found.get(term, max_distance + 1):
+                        found[term] = distance
+            if min(row) <= max_distance:
+                stack.extend((child, next_ch, row) for next_ch, child in node.children.items())
+        return found
+
+    def _candidates(self, token: str, prefix: bool) -> Dict[str, float]:
+        """
+        Index terms a query token may refer to, with how strongly each matches.
+        Typo-tolerant matching is only tried when nothing matches as typed.
+        """
+        candidates: Dict[str, float] = {}
+        if token in self._postings:
+            candidates[token] = EXACT
+        if prefix:
+            for term in self._prefix_terms(token):
+                candidates.setdefault(term, PREFIX)
+        typos = max_typos(token)
+        if not candidates and typos:
+            for term, distance in self._fuzzy_terms(token, typos, prefix).items():
+                candidates[term] = FUZZY / distance
+        return candidates
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """
+        Items matching every query token, best first. The last token is also
+        matched as a prefix since it may still be being typed.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        key = (tuple(tokens), limit)
+        if key in self._results:
+            return self._results[key]
+        if len(self._results) >= MAX_CACHED_QUERIES:
+            self._results.clear()
+        self._results[key] = results = self._search(tokens, limit)
+        return results
+
+    def _search(self, tokens: List[str], limit: int) -> List[dict]:
+        scores: Optional[Dict[str, float]] = None
+        for position, token in enumerate(tokens):
+            token_scores: Dict[str, float] = {}
+            for term, strength in self._candidates(token, prefix=position == len(tokens) - 1).items():
+                for item_id, weight in self._postings.get(term, {}).items():
+                    score = strength * weight
+                    if score > token_scores.get(item_id, 0.0):
+                        token_scores[item_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {item_id: score + token_scores[item_id] for item_id, score in scores.items() if item_id in token_scores}
+            if not scores:
+                return []
+
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda entry: (-entry[1], self._items[entry[0]]["name"]))
+        return [self._items[item_id] for item_id, _ in ranked]
+
+
+menu_search = MenuSearchIndex(menu_catalog, ttl_seconds=settings.MENU_CATALOG_TTL_SECONDS)
@@ -0,0 +1,77 @@
+import types
+from functools import lru_cache
+from inspect import isclass
+from typing import Any, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Routers opt in with
+    `default_response_class=FastJSONResponse`; routes that return one directly
+    (see document_to_dict) also skip FastAPI's response_model validation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _nested_model(annotation) -> Optional[Tuple[Type[BaseModel], bool]]:
+    """
+    (model, is_list) when a field holds a model, an Optional model or a list of models.
+    """
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else None
+    if origin in (list, List):
+        nested = _nested_model(get_args(annotation)[0])
+        return (nested[0], True) if nested else None
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]):
+    plan = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() else field.get_default
+        plan.append((name, default, _nested_model(field.annotation)))
+    return plan
+
+
+def document_to_dict(model: Type[BaseModel], doc: dict) -> dict:
+    """
+    Shape a document read from our own database like `model` would serialize
+    it, without running validation. Only for trusted data: the fields are
+    copied as stored, with defaults filled in and `_id` mapped to `id`.
+    """
+    out = {}
+    for name, default, nested in _plan(model):
+        if name == "id" and "_id" in doc:
+            value = str(doc["_id"])
+        elif name in doc:
+            value = doc[name]
+        else:
+            value = default(call_default_factory=True) if default else None
+        if nested and value is not None:
+            nested_model, is_list = nested
+            if is_list:
+                value = [document_to_dict(nested_model, v) for v in value]
+            else:
+                value = document_to_dict(nested_model, value)
+        out[name] = value
+    return out
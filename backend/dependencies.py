@@ -6,6 +6,7 @@ from pydantic import ValidationError
 
 from core.config import settings
 from core.database import get_database
+from core.principal_cache import principal_cache
 from models.user_models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
@@ -28,17 +29,30 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = await db.users.find_one({"email": email})
+    async def load_user():
+        user = await db.users.find_one({"email": email}, {"hashed_password": 0})
+        if user is None:
+            return None
+        
+        # Convert ObjectId to string
+        user_dict = dict(user)
+        user_dict["id"] = str(user_dict.pop("_id"))
+        return User(**user_dict)
+
+    # Users are cached per token subject and issue time; see core/principal_cache.py
+    user = await principal_cache.get((email, payload.get("iat")), load_user)
     if user is None:
         raise credentials_exception
-    
-    # Convert ObjectId to string
-    user_dict = dict(user)
-    user_dict["id"] = str(user_dict.pop("_id"))
-    # Remove hashed_password as User model doesn't include it
-    user_dict.pop("hashed_password", None)
-    
-    return User(**user_dict)
+    return user
+
+async def get_current_user_from_query(
+    token: str, db: AsyncIOMotorDatabase = Depends(get_database)
+) -> User:
+    """
+    Same as get_current_user, for clients that can't send headers (e.g. EventSource)
+    and pass the bearer token as a `token` query parameter instead.
+    """
+    return await get_current_user(token=token, db=db)
 
 async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
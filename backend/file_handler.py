@@ -1,54 +1,361 @@
+import asyncio
+import hashlib
 import os
+import re
+import time
 import uuid
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
 from fastapi import UploadFile, HTTPException, status
+from fastapi.staticfiles import StaticFiles
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.staticfiles import NotModifiedResponse
 import aiofiles
 
+from core.images import IMAGE_VARIANTS, InvalidImage, image_processor, partial_name
+
 # Directory to store uploaded images
 UPLOAD_DIR = Path("uploads/images")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Allowed file extensions
+# Uploads in progress; not served, and on the same filesystem so renames are atomic
+UPLOAD_TMP_DIR = Path("uploads/tmp")
+UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+# Allowed image types, identified by their leading bytes rather than the file name
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+# Room for the multipart boundaries and part headers around the file
+MAX_UPLOAD_BODY = MAX_FILE_SIZE + 64 * 1024
+UPLOAD_PATHS = ("/api/menu/upload-image",)
+CHUNK_SIZE = 64 * 1024
+
+IMAGE_URL_PREFIX = "/api/uploads/images/"
+
+# Images are stored under the SHA-256 of the uploaded bytes, so a name always
+# refers to the same content: `<hash>_<variant>.<ext>`
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{32})_[a-z]+\.(webp|jpg|png)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unreferenced images younger than this are kept: they may have just been
+# uploaded for an item that hasn't been saved yet
+ORPHAN_GRACE_SECONDS = 3600
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """
+    File extension for the image format `header` starts with, or None.
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects upload requests whose body is bigger than `max_body` before the
+    multipart form is parsed (FastAPI reads the whole form, spooling files to
+    disk, before the route runs). A declared Content-Length over the limit is
+    refused without reading anything; bodies without one are counted as they
+    arrive and cut off once they pass it.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_body: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body = max_body
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        # 413 by number; the constant's name differs between Starlette versions
+        response = JSONResponse({"detail": f"File size exceeds {MAX_FILE_SIZE / 1024 / 1024}MB limit"}, status_code=413)
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        declared = Headers(scope=scope).get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        too_large = False
+        replaced = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    too_large = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def replacing_send(message: Message):
+            nonlocal replaced
+            # FastAPI turns the aborted form parse into a 400; answer 413 instead
+            if too_large:
+                if not replaced:
+                    replaced = True
+                    await self._reject(scope, receive, send)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, replacing_send)
+        except _BodyTooLarge:
+            if not replaced:
+                await self._reject(scope, receive, send)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File size exceeds {MAX_FILE_SIZE / 1024 / 1024}MB limit"
+    )
+
+
+async def _receive_upload(file: UploadFile, upload_id: str) -> Tuple[Path, str]:
+    """
+    Copy an upload into a temp file chunk by chunk, so memory use is bounded
+    by CHUNK_SIZE. Stops as soon as the size limit is passed or the first
+    bytes don't look like an allowed image, and renames into place only once
+    the whole file has been received. Returns the file and its SHA-256.
+    """
+    # Starlette counted the bytes while spooling the form; skip the copy when already too big.
+    # Oversized request bodies are turned away earlier, by UploadSizeLimitMiddleware
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    partial = UPLOAD_TMP_DIR / f"{upload_id}.part"
+    digest = hashlib.sha256()
+    received = 0
+    file_ext = None
+    try:
+        async with aiofiles.open(partial, "wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                if file_ext is None:
+                    file_ext = sniff_image_type(chunk[:16])
+                    if file_ext is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+                        )
+                received += len(chunk)
+                if received > MAX_FILE_SIZE:
+                    raise _too_large()
+                digest.update(chunk)
+                await out.write(chunk)
+        if file_ext is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is empty")
+
+        file_path = UPLOAD_TMP_DIR / f"{upload_id}{file_ext}"
+        os.replace(partial, file_path)
+        return file_path, digest.hexdigest()
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+
+def _stored_variants(stem: str) -> Optional[Dict[str, Dict[str, Path]]]:
+    """
+    Paths of every variant stored under `stem`, or None if any is missing.
+    """
+    variants = {}
+    for name in IMAGE_VARIANTS:
+        webp = UPLOAD_DIR / f"{stem}_{name}.webp"
+        fallback = next((p for p in (UPLOAD_DIR / f"{stem}_{name}.jpg", UPLOAD_DIR / f"{stem}_{name}.png") if p.exists()), None)
+        if not webp.exists() or fallback is None:
+            return None
+        variants[name] = {"webp": webp, "fallback": fallback}
+    return variants
+
+
+def image_variants_for(image_url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Variant URLs for an image produced by save_menu_image, found from its
+    "full" URL. Returns None for external or older uploads without variants.
+    """
+    if not image_url or not image_url.startswith(IMAGE_URL_PREFIX):
+        return None
+    filename = image_url[len(IMAGE_URL_PREFIX):]
+    stem, sep, _ = filename.rpartition("_full.")
+    if not sep or "/" in stem:
+        return None
+
+    variants = _stored_variants(stem)
+    if variants is None:
+        return None
+    return {
+        name: {kind: IMAGE_URL_PREFIX + path.name for kind, path in files.items()}
+        for name, files in variants.items()
+    }
+
 
-async def save_menu_image(file: UploadFile) -> str:
+async def save_menu_image(file: UploadFile) -> Tuple[str, Dict[str, Dict[str, str]]]:
     """
-    Save an uploaded image file and return the file path.
+    Save an uploaded image as resized, metadata-free variants (thumb, medium
+    and full; WebP plus a JPEG/PNG fallback), named after the hash of the
+    upload. Uploading an image that is already stored reuses its variants.
+    The original upload is removed.
     
     Args:
         file: The uploaded file
         
     Returns:
-        str: The relative path to the saved file
+        The URL of the full-size fallback image, which is what menu items
+        store as `image_url`, and the URLs of every variant
         
     Raises:
         HTTPException: If file is invalid
     """
     
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
+    upload_id = uuid.uuid4().hex
+    file_path, digest = await _receive_upload(file, upload_id)
+    stem = digest[:32]
     
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds {MAX_FILE_SIZE / 1024 / 1024}MB limit"
-        )
+    try:
+        existing = _stored_variants(stem)
+        if existing:
+            # Same bytes as an image we already have; refresh it so it isn't collected as an orphan
+            for files in existing.values():
+                for path in files.values():
+                    os.utime(path)
+            variants = {name: {kind: path.name for kind, path in files.items()} for name, files in existing.items()}
+        else:
+            try:
+                variants = await image_processor.render_variants(file_path, UPLOAD_DIR, stem, upload_id)
+            except InvalidImage:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File is not a valid image"
+                )
+            finally:
+                # Only this render's leftovers: another upload of the same bytes
+                # may be rendering, or have already stored, the finished files
+                for partial in UPLOAD_DIR.glob(partial_name(f"{stem}_*", upload_id)):
+                    partial.unlink(missing_ok=True)
+    finally:
+        os.remove(file_path)
     
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    # Save file
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(file_content)
-    
-    # Return relative path for URL access, prefixed with /api
-    return f"/api/uploads/images/{unique_filename}"
+    # Relative paths for URL access, prefixed with /api
+    variant_urls = {
+        name: {kind: IMAGE_URL_PREFIX + filename for kind, filename in files.items()}
+        for name, files in variants.items()
+    }
+    return variant_urls["full"]["fallback"], variant_urls
+
+
+async def release_menu_image(db: AsyncIOMotorDatabase, image_url: Optional[str]):
+    """
+    Call when a menu item stops using `image_url`. The image's files are
+    deleted once no menu item references it any more (and it is older than
+    the grace period). External URLs and older uploads are left alone.
+    """
+    if not image_url or not image_url.startswith(IMAGE_URL_PREFIX):
+        return
+    match = CONTENT_ADDRESSED_NAME.match(image_url[len(IMAGE_URL_PREFIX):])
+    if not match:
+        return
+    if await db.menu_items.count_documents({"image_url": image_url}, limit=1):
+        return
+
+    files = list(UPLOAD_DIR.glob(f"{match.group(1)}_*"))
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    if files and all(path.stat().st_mtime < cutoff for path in files):
+        for path in files:
+            path.unlink(missing_ok=True)
+
+
+def _remove_orphans(referenced: Set[str], cutoff: float) -> int:
+    """
+    Delete content-addressed images whose hash isn't in `referenced` and
+    whose files are all older than `cutoff`, plus abandoned partial uploads
+    and renders.
+    Returns the number of files removed.
+    """
+    by_stem = {}
+    for path in UPLOAD_DIR.iterdir():
+        match = CONTENT_ADDRESSED_NAME.match(path.name)
+        if match and match.group(1) not in referenced:
+            by_stem.setdefault(match.group(1), []).append(path)
+
+    removed = 0
+    for files in by_stem.values():
+        if all(path.stat().st_mtime < cutoff for path in files):
+            for path in files:
+                path.unlink(missing_ok=True)
+            removed += len(files)
+    for partial in [*UPLOAD_TMP_DIR.glob("*.part"), *UPLOAD_DIR.glob(".*.part")]:
+        if partial.stat().st_mtime < cutoff:
+            partial.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+async def sweep_orphan_images(db: AsyncIOMotorDatabase) -> int:
+    """
+    Remove stored images no menu item references any more, once they are
+    older than the grace period. Catches what release_menu_image can't:
+    images replaced soon after upload and uploads never saved to an item.
+    """
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    referenced = set()
+    async for item in db.menu_items.find({"image_url": {"$regex": f"^{IMAGE_URL_PREFIX}"}}, {"image_url": 1}):
+        match = CONTENT_ADDRESSED_NAME.match(item["image_url"][len(IMAGE_URL_PREFIX):])
+        if match:
+            referenced.add(match.group(1))
+    return await asyncio.to_thread(_remove_orphans, referenced, cutoff)
+
+
+async def sweep_orphan_images_periodically(db: AsyncIOMotorDatabase, interval: float):
+    """Run sweep_orphan_images every `interval` seconds until cancelled"""
+    while True:
+        try:
+            removed = await sweep_orphan_images(db)
+            if removed:
+                print(f"Removed {removed} orphaned image files")
+        except Exception as e:
+            print(f"Orphaned image sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+class ImageFiles(StaticFiles):
+    """
+    Static mount for uploaded images. Content-addressed files never change,
+    so they are served with a far-future immutable Cache-Control and a
+    strong ETag derived from their name; browsers and proxies don't need to
+    revalidate them. Older uploads keep the default headers.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        name = os.path.basename(full_path)
+        if not CONTENT_ADDRESSED_NAME.match(name):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        headers = {"ETag": f'"{name}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
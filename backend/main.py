@@ -1,10 +1,23 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
+from pymongo.errors import PyMongoError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
+from core.config import settings
 from core.database import db
-from routes import auth_routes, user_routes, menu_routes, order_routes
+from core.db_monitor import ping, pool_monitor
+from core.indexes import ensure_indexes, check_index_drift
+from core.images import image_processor
+from core.ingest import order_ingest
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics
+from core.rate_limit import RateLimitMiddleware, rate_limiter
+from file_handler import (
+    MAX_UPLOAD_BODY, UPLOAD_PATHS, ImageFiles, UploadSizeLimitMiddleware, sweep_orphan_images_periodically
+)
+from runtime_metrics import register_runtime_metrics
+from routes import auth_routes, user_routes, menu_routes, order_routes, report_routes
 
 app = FastAPI(
     title="POS Restaurant API",
@@ -12,6 +25,13 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# Oversized uploads are refused before FastAPI parses (and spools) the form
+app.add_middleware(UploadSizeLimitMiddleware, paths=UPLOAD_PATHS, max_body=MAX_UPLOAD_BODY)
+
+# Rate limiting sits inside CORS so rejections still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,18 +41,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so rate limited requests are measured too
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Mount static files directory for image uploads
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
-app.mount("/api/uploads/images", StaticFiles(directory="uploads/images"), name="images")
+app.mount("/api/uploads/images", ImageFiles(directory="uploads/images"), name="images")
 
 @app.on_event("startup")
 async def startup_db_client():
     await db.connect()
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        # The database may be unreachable at boot; serve anyway and report it
+        try:
+            for failure in await ensure_indexes(db.db):
+                print(f"Index creation failed: {failure}")
+            drift = await check_index_drift(db.db)
+            if drift:
+                print(f"Index drift detected: {drift}")
+        except PyMongoError as e:
+            print(f"Index check skipped, database unavailable: {e}")
+    if settings.ORDER_INGEST_ENABLED:
+        order_ingest.start(db.db)
+    app.state.image_sweeper = None
+    if settings.IMAGE_ORPHAN_SWEEP_INTERVAL_SECONDS > 0:
+        app.state.image_sweeper = asyncio.create_task(
+            sweep_orphan_images_periodically(db.db, settings.IMAGE_ORPHAN_SWEEP_INTERVAL_SECONDS)
+        )
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if app.state.image_sweeper:
+        app.state.image_sweeper.cancel()
+    # Flush orders still waiting in the ingestion buffer before closing the client
+    await order_ingest.drain()
     await db.disconnect()
+    image_processor.shutdown()
 
 @app.get("/")
 def read_root():
@@ -42,7 +88,32 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/health/db")
+async def database_health(response: Response):
+    latency = await ping(db.client)
+    if not latency["ok"]:
+        response.status_code = 503
+    pool = db.client.options.pool_options
+    return {
+        "status": "ok" if latency["ok"] else "unavailable",
+        "ping": latency,
+        "pool": {
+            "max_size": pool.max_pool_size,
+            "min_size": pool.min_pool_size,
+            "wait_queue_timeout_ms": int(pool.wait_queue_timeout * 1000) if pool.wait_queue_timeout else None,
+            **pool_monitor.stats(),
+        },
+    }
+
+if settings.METRICS_ENABLED:
+    register_runtime_metrics(metrics)
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 app.include_router(auth_routes.router)
 app.include_router(user_routes.router)
 app.include_router(menu_routes.router)
 app.include_router(order_routes.router)
+app.include_router(report_routes.router)
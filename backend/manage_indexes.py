@@ -0,0 +1,37 @@
+"""
+Apply the declared MongoDB indexes, or report drift between them and the server.
+
+    python manage_indexes.py           # create missing indexes, then report drift
+    python manage_indexes.py --check   # only report drift; exits 1 if there is any
+"""
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from core.config import settings
+from core.indexes import ensure_indexes, check_index_drift
+
+async def manage_indexes(check_only: bool) -> int:
+    """Apply and/or verify indexes, returning the process exit code"""
+    client = AsyncIOMotorClient(settings.DATABASE_URL)
+    db = client[settings.DATABASE_NAME]
+
+    if not check_only:
+        failures = await ensure_indexes(db)
+        for failure in failures:
+            print(f"✗ {failure}")
+        if not failures:
+            print("✓ Indexes applied")
+
+    drift = await check_index_drift(db)
+    for collection, problems in drift.items():
+        for kind, names in problems.items():
+            if names:
+                print(f"✗ {collection}: {kind} {', '.join(names)}")
+    if not drift:
+        print("✓ No index drift")
+
+    client.close()
+    return 1 if drift else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(manage_indexes("--check" in sys.argv[1:])))
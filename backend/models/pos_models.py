@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Optional, List, Dict, Set
 from datetime import datetime
 from enum import Enum
 from bson import ObjectId
@@ -11,6 +11,22 @@ class OrderStatus(str, Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+ACTIVE_ORDER_STATUSES = (OrderStatus.PENDING, OrderStatus.PREPARING, OrderStatus.READY)
+
+# Allowed status changes; completed and cancelled orders are final.
+# Paying an order moves any active order straight to completed.
+ORDER_STATUS_TRANSITIONS: Dict[OrderStatus, Set[OrderStatus]] = {
+    OrderStatus.PENDING: {OrderStatus.PREPARING, OrderStatus.CANCELLED},
+    OrderStatus.PREPARING: {OrderStatus.READY, OrderStatus.CANCELLED},
+    OrderStatus.READY: {OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.COMPLETED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+def statuses_allowing(new_status: OrderStatus) -> List[str]:
+    """Statuses an order may be in to move to `new_status`."""
+    return [old.value for old, targets in ORDER_STATUS_TRANSITIONS.items() if new_status in targets]
+
 class PaymentMethod(str, Enum):
     CASH = "cash"
     CARD = "card"
@@ -73,6 +89,8 @@ class MenuItemUpdate(BaseModel):
 
 class MenuItemInDBBase(MenuItemBase):
     id: str
+    # Resized copies of image_url: {"thumb" | "medium" | "full": {"webp": url, "fallback": url}}
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -83,6 +101,12 @@ class MenuItemInDBBase(MenuItemBase):
 class MenuItem(MenuItemInDBBase):
     pass
 
+class CategoryWithItems(Category):
+    """
+    A category with all of its menu items, for loading a whole menu at once.
+    """
+    items: List[MenuItem] = []
+
 # ============= Order Item Models =============
 
 class OrderItemBase(BaseModel):
@@ -150,6 +174,7 @@ class OrderInDBBase(BaseModel):
     notes: Optional[str] = None
     total_amount: float = Field(..., gt=0)
     payment: Optional[Payment] = None
+    version: int = 0  # bumped on every write, for optimistic concurrency
     created_by: str  # user_id who created the order
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -160,3 +185,103 @@ class OrderInDBBase(BaseModel):
 
 class Order(OrderInDBBase):
     pass
+
+class OrderSummary(BaseModel):
+    """
+    Order without its line items, for list views.
+    """
+    id: str
+    status: OrderStatus
+    table_number: Optional[int] = None
+    customer_name: Optional[str] = None
+    notes: Optional[str] = None
+    total_amount: float
+    item_count: int = 0
+    payment: Optional[Payment] = None
+    version: int = 0
+    created_by: str
+    created_at: datetime
+    updated_at: datetime
+
+class OrderPage(BaseModel):
+    items: List[Order]
+    next_cursor: Optional[str] = None
+
+class OrderSummaryPage(BaseModel):
+    items: List[OrderSummary]
+    next_cursor: Optional[str] = None
+
+
+# ============= Bulk Operation Models =============
+
+class BulkOrderOperation(BaseModel):
+    """
+    One change in a bulk request: either a status change or a payment.
+    """
+    order_id: str = Field(..., example="507f1f77bcf86cd799439020")
+    status: Optional[OrderStatus] = Field(None, example="completed")
+    payment: Optional[PaymentCreate] = None
+    version: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_single_action(self):
+        if (self.status is None) == (self.payment is None):
+            raise ValueError("Provide exactly one of status or payment")
+        return self
+
+class BulkOrderRequest(BaseModel):
+    operations: List[BulkOrderOperation] = Field(..., min_length=1, max_length=200)
+
+class BulkOrderResult(BaseModel):
+    index: int
+    order_id: str
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    order: Optional[Order] = None
+
+class BulkOrderResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkOrderResult]
+
+# ============= Reporting Models =============
+
+class OrderStats(BaseModel):
+    period: str = Field(..., example="day:2024-01-31")
+    total_orders: int = 0
+    completed: int = 0
+    in_progress: int = 0
+    cancelled: int = 0
+    paid_orders: int = 0
+    revenue: float = 0.0
+    by_status: Dict[str, int] = {}
+    hourly: Optional[List["OrderStats"]] = None
+
+class TopSeller(BaseModel):
+    menu_item_id: str
+    name: Optional[str] = None
+    quantity: int
+    revenue: float
+
+class CategoryRevenue(BaseModel):
+    category_id: Optional[str] = None
+    name: Optional[str] = None
+    quantity: int
+    revenue: float
+
+class SalesHeatmap(BaseModel):
+    """Rows are weekdays (Monday first), columns are hours of the day (UTC)."""
+    orders: List[List[int]]
+    revenue: List[List[float]]
+
+class AddonAttachRate(BaseModel):
+    name: str
+    lines: int
+    attach_rate: float
+
+class TicketSize(BaseModel):
+    orders: int
+    average_total: float
+    median_total: float
+    average_units: float
@@ -1,16 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
 
 from core.database import get_database
+from core.principal_cache import principal_cache
+from core.repository import insert_document
 from models.user_models import User, UserCreate
-from security import get_password_hash, verify_password, create_access_token
+from security import PasswordHasherBusy, create_access_token, password_hasher
 
 router = APIRouter(
     prefix="/api/auth",
     tags=["Authentication"],
 )
 
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_in: UserCreate, db: AsyncIOMotorDatabase = Depends(get_database)
@@ -25,7 +36,10 @@ async def register_user(
             detail="User with this email already exists",
         )
 
-    hashed_password = get_password_hash(user_in.password)
+    try:
+        hashed_password = await password_hasher.hash(user_in.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     
     # Prepare user data without the id (MongoDB will generate it)
     user_data = {
@@ -35,9 +49,14 @@ async def register_user(
         "hashed_password": hashed_password
     }
 
-    new_user = await db.users.insert_one(user_data)
-    
-    created_user = await db.users.find_one({"_id": new_user.inserted_id})
+    try:
+        created_user = await insert_document(db.users, user_data)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same email
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email already exists",
+        )
     
     # Remove the ObjectId field and replace with string id
     created_user_dict = dict(created_user)
@@ -57,13 +76,30 @@ async def login_for_access_token(
     OAuth2 compatible token login, get an access token for future requests.
     """
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await password_hasher.verify_and_update(
+                form_data.password, user["hashed_password"]
+            )
+        except PasswordHasherBusy:
+            raise _hasher_busy()
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if new_hash:
+        # Stored hash used outdated settings (e.g. fewer bcrypt rounds); upgrade it.
+        # Conditional on the old hash so a concurrent password change isn't overwritten.
+        await db.users.update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}},
+        )
+        principal_cache.invalidate(user["email"])
+    
     access_token = create_access_token(
         data={"sub": user["email"], "role": user["role"]}
     )
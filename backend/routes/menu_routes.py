@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
+from typing import Optional
 
+from core.catalog import menu_catalog
 from core.database import get_database
+from core.menu_cache import menu_responses
+from core.menu_stats import popularity_ranking
+from core.search import menu_search
+from core.serialization import FastJSONResponse, document_to_dict
+from core.repository import insert_document, update_document, update_document_with_previous
 from dependencies import get_current_admin_user
 from models.user_models import User
 from models.pos_models import (
-    Category, CategoryCreate, MenuItem, MenuItemCreate, MenuItemUpdate
+    Category, CategoryCreate, CategoryWithItems, MenuItem, MenuItemCreate, MenuItemUpdate
 )
-from file_handler import save_menu_image
+from file_handler import image_variants_for, release_menu_image, save_menu_image
 
 router = APIRouter(
     prefix="/api/menu",
     tags=["Menu Management"],
+    default_response_class=FastJSONResponse,
 )
 
 # ============= Category Routes =============
@@ -28,8 +36,9 @@ async def create_category(
     Create a new menu category. Admin only.
     """
     category_data = category_in.dict()
-    result = await db.categories.insert_one(category_data)
-    created_category = await db.categories.find_one({"_id": result.inserted_id})
+    created_category = await insert_document(db.categories, category_data)
+    menu_catalog.invalidate()
+    menu_search.upsert_category(created_category)
     created_category["id"] = str(created_category["_id"])
     return Category(**created_category)
 
@@ -48,13 +57,17 @@ async def list_categories(
 
 @router.get("/categories/public", response_model=list[Category])
 async def list_categories_public(
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get all menu categories (public endpoint).
+    Get all menu categories (public endpoint). Supports ETag / If-None-Match.
     """
-    categories = await db.categories.find().to_list(None)
-    return [Category(**cat, id=str(cat["_id"])) for cat in categories]
+    async def build():
+        categories = await db.categories.find().to_list(None)
+        return [document_to_dict(Category, cat) for cat in categories]
+
+    return await menu_responses.respond(request, ("categories",), build)
 
 
 @router.get("/categories/{category_id}", response_model=Category)
@@ -95,12 +108,13 @@ async def update_category(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category ID")
     
     category_data = category_in.dict()
-    result = await db.categories.update_one({"_id": obj_id}, {"$set": category_data})
+    updated_category = await update_document(db.categories, {"_id": obj_id}, category_data)
     
-    if result.matched_count == 0:
+    if not updated_category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    menu_catalog.invalidate()
+    menu_search.upsert_category(updated_category)
     
-    updated_category = await db.categories.find_one({"_id": obj_id})
     updated_category["id"] = str(updated_category["_id"])
     return Category(**updated_category)
 
@@ -122,6 +136,8 @@ async def delete_category(
     result = await db.categories.delete_one({"_id": obj_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    menu_catalog.invalidate()
+    menu_search.remove_category(str(obj_id))
 
 
 # ============= Menu Item Routes =============
@@ -136,59 +152,113 @@ async def create_menu_item(
     Create a new menu item. Admin only.
     """
     item_data = item_in.dict()
+    item_data["image_variants"] = image_variants_for(item_data.get("image_url"))
     item_data["created_at"] = datetime.utcnow()
     item_data["updated_at"] = datetime.utcnow()
     
-    result = await db.menu_items.insert_one(item_data)
-    created_item = await db.menu_items.find_one({"_id": result.inserted_id})
-    
-    if created_item:
-        created_item["id"] = str(created_item["_id"])
+    created_item = await insert_document(db.menu_items, item_data)
+    menu_catalog.invalidate()
+    menu_search.upsert_item(created_item)
     
+    created_item["id"] = str(created_item["_id"])
     return MenuItem(**created_item)
 
 
 @router.get("/items", response_model=list[MenuItem])
 async def list_menu_items(
+    request: Request,
     category_id: str = None,
+    sort: Optional[str] = Query(None, pattern="^popular$"),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get all menu items, optionally filtered by category.
+    Get all menu items, optionally filtered by category. `sort=popular` lists
+    the items ordered most over the last 7 days first. Supports ETag /
+    If-None-Match; the popular ordering follows sales rather than menu
+    edits, so it isn't cached.
     """
-    query = {}
-    if category_id:
-        query["category_id"] = category_id
-    
-    items = await db.menu_items.find(query).to_list(None)
-    print(f"Found {len(items)} items in the database.")
-    
-    processed_items = []
-    for item_doc in items:
-        item_doc["id"] = str(item_doc["_id"])
-        processed_items.append(MenuItem(**item_doc))
-    return processed_items
+    async def build():
+        query = {}
+        if category_id:
+            query["category_id"] = category_id
+        
+        items = await db.menu_items.find(query).to_list(None)
+        print(f"Found {len(items)} items in the database.")
+
+        if sort == "popular":
+            ranking = await popularity_ranking(db)
+            items.sort(key=lambda item: ranking.get(str(item["_id"]), len(ranking)))
+        
+        return [document_to_dict(MenuItem, item_doc) for item_doc in items]
+
+    if sort == "popular":
+        return FastJSONResponse(await build())
+    return await menu_responses.respond(request, ("items", category_id), build)
+
+
+@router.get("/full", response_model=list[CategoryWithItems])
+async def get_full_menu(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Every category with all of its items nested (sizes, addons and image
+    URLs included), so a terminal can load the whole menu in one request.
+    Unavailable items are kept, flagged by `available`, so clients can show
+    them as out of stock. Built from the menu catalog; supports ETag /
+    If-None-Match.
+    """
+    async def build():
+        items = await menu_catalog.get_items(db)
+        categories = await db.categories.find().to_list(None)
+
+        by_category = {}
+        for item in items.values():
+            by_category.setdefault(item.get("category_id"), []).append(document_to_dict(MenuItem, item))
+        return [
+            {**document_to_dict(Category, cat), "items": by_category.get(str(cat["_id"]), [])}
+            for cat in categories
+        ]
+
+    return await menu_responses.respond(request, ("full",), build)
+
+
+@router.get("/search", response_model=list[MenuItem])
+async def search_menu_items(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Search menu items by name, description and category name. Matches partial
+    words and tolerates small typos; answered from memory.
+    """
+    await menu_search.ensure_loaded(db)
+    return FastJSONResponse(menu_search.search(q, limit))
 
 
 @router.get("/items/{item_id}", response_model=MenuItem)
 async def get_menu_item(
     item_id: str,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get a specific menu item.
+    Get a specific menu item. Supports ETag / If-None-Match.
     """
     try:
         obj_id = ObjectId(item_id)
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid item ID")
     
-    item = await db.menu_items.find_one({"_id": obj_id})
-    if not item:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
-    
-    item["id"] = str(item["_id"])
-    return MenuItem(**item)
+    async def build():
+        item = await db.menu_items.find_one({"_id": obj_id})
+        if not item:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
+        
+        return document_to_dict(MenuItem, item)
+
+    return await menu_responses.respond(request, ("item", str(obj_id)), build)
 
 
 @router.put("/items/{item_id}", response_model=MenuItem)
@@ -207,14 +277,19 @@ async def update_menu_item(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid item ID")
     
     item_data = item_in.dict(exclude_unset=True)
+    if "image_url" in item_data:
+        item_data["image_variants"] = image_variants_for(item_data["image_url"])
     item_data["updated_at"] = datetime.utcnow()
     
-    result = await db.menu_items.update_one({"_id": obj_id}, {"$set": item_data})
+    previous_item, updated_item = await update_document_with_previous(db.menu_items, {"_id": obj_id}, item_data)
     
-    if result.matched_count == 0:
+    if not updated_item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
+    menu_catalog.invalidate()
+    menu_search.upsert_item(updated_item)
+    if previous_item.get("image_url") != updated_item.get("image_url"):
+        await release_menu_image(db, previous_item.get("image_url"))
     
-    updated_item = await db.menu_items.find_one({"_id": obj_id})
     updated_item["id"] = str(updated_item["_id"])
     return MenuItem(**updated_item)
 
@@ -233,9 +308,12 @@ async def delete_menu_item(
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid item ID")
     
-    result = await db.menu_items.delete_one({"_id": obj_id})
-    if result.deleted_count == 0:
+    deleted_item = await db.menu_items.find_one_and_delete({"_id": obj_id}, {"image_url": 1})
+    if deleted_item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
+    menu_catalog.invalidate()
+    menu_search.remove_item(str(obj_id))
+    await release_menu_image(db, deleted_item.get("image_url"))
 
 
 # ============= Image Upload Route =============
@@ -247,11 +325,14 @@ async def upload_menu_image(
 ):
     """
     Upload an image for a menu item. Admin only.
-    Returns the image URL path.
+    Returns the image URL path (the full-size variant) and the URLs of the
+    thumbnail, medium and full WebP/fallback variants. Menu items saved with
+    that URL pick up the variants automatically.
     """
-    image_url = await save_menu_image(file)
+    image_url, variants = await save_menu_image(file)
     return {
         "url": image_url,
+        "variants": variants,
         "filename": file.filename,
         "message": "Image uploaded successfully"
     }
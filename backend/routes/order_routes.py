@@ -1,21 +1,162 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from datetime import datetime
-from typing import List
+from datetime import datetime, date
+from pymongo.errors import PyMongoError
+from typing import List, Optional
 
+from core.archive import archive_orders, find_archived_order
+from core.catalog import menu_catalog
+from core.config import settings
 from core.database import get_database
-from dependencies import get_current_user, get_current_admin_user
+from core.serialization import FastJSONResponse, document_to_dict
+from core.repository import insert_document, update_document_with_previous
+from core.pagination import KEYSET_SORT, keyset_filter, split_page
+from core.events import order_events
+from core.ingest import IngestQueueFull, order_ingest
+from core.order_export import csv_chunks, iter_export_rows, ndjson_chunks
+from core.menu_stats import rebuild_menu_item_stats
+from core.order_changes import publish_order_event, record_changes
+from core.order_stats import get_order_stats, rebuild_order_rollups
+from dependencies import get_current_user, get_current_admin_user, get_current_user_from_query
 from models.user_models import User
 from models.pos_models import (
-    Order, OrderCreate, OrderUpdate, OrderStatus, PaymentCreate, Payment
+    Order, OrderCreate, OrderUpdate, OrderStatus, OrderStats, OrderSummary,
+    OrderPage, OrderSummaryPage, PaymentCreate, Payment,
+    BulkOrderRequest, BulkOrderResponse, BulkOrderResult,
+    ACTIVE_ORDER_STATUSES, statuses_allowing
 )
 
 router = APIRouter(
     prefix="/api/orders",
     tags=["Orders"],
+    default_response_class=FastJSONResponse,
 )
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SUMMARY_PROJECTION = {
+    "status": 1,
+    "table_number": 1,
+    "customer_name": 1,
+    "notes": 1,
+    "total_amount": 1,
+    "payment": 1,
+    "version": 1,
+    "created_by": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "item_count": {"$size": "$items"},
+}
+
+
+async def _find_order_page(
+    db: AsyncIOMotorDatabase,
+    status_filter: Optional[OrderStatus],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    cursor: Optional[str],
+    limit: int,
+    projection: Optional[dict] = None,
+):
+    """
+    Fetch one page of orders, newest first, using keyset pagination on (created_at, _id).
+    """
+    query = {}
+    if status_filter:
+        query["status"] = status_filter
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    if cursor:
+        try:
+            query = {"$and": [query, keyset_filter(cursor)]}
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    docs = await db.orders.find(query, projection).sort(KEYSET_SORT).limit(limit + 1).to_list(None)
+    return split_page(docs, limit)
+
+
+def _order_response(order: dict, status_code: int = status.HTTP_200_OK) -> FastJSONResponse:
+    """
+    Serialize an order document straight from the database, skipping response_model validation.
+    """
+    return FastJSONResponse(document_to_dict(Order, order), status_code=status_code)
+
+
+def _write_filter(obj_id: ObjectId, version: Optional[int], **conditions) -> dict:
+    """
+    Filter for a conditional order write. When the client sends the `version`
+    it last saw, the write only applies if nobody has changed the order since.
+    """
+    query = {"_id": obj_id, **conditions}
+    if version is not None:
+        # Orders created before versioning have no field, which counts as version 0
+        query["version"] = version if version else {"$in": [0, None]}
+    return query
+
+
+def _write_rejection(
+    order: Optional[dict],
+    version: Optional[int],
+    allowed_from: Optional[List[str]] = None,
+    new_status: Optional[OrderStatus] = None,
+    require_unpaid: bool = False,
+    payment_amount: Optional[float] = None,
+) -> Optional[HTTPException]:
+    """
+    Return the error a conditional write on `order` would fail with, or None
+    if every precondition holds.
+    """
+    if not order:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    
+    if version is not None and order.get("version", 0) != version:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Order was modified by another request (version {order.get('version', 0)}, expected {version})"
+        )
+    if require_unpaid and order.get("payment"):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Order has already been paid")
+    if allowed_from is not None and order["status"] not in allowed_from:
+        if new_status is None:
+            return HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Cannot change an order that is {order['status']}"
+            )
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot change order status from {order['status']} to {new_status.value}"
+        )
+    if payment_amount is not None and payment_amount < order["total_amount"]:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Payment amount ({payment_amount}) is less than order total ({order['total_amount']})"
+        )
+    return None
+
+
+async def _raise_rejected_write(db: AsyncIOMotorDatabase, obj_id: ObjectId, version: Optional[int], **preconditions):
+    """
+    A conditional order write matched nothing. Read the order once to report why.
+    """
+    order = await db.orders.find_one(
+        {"_id": obj_id}, {"status": 1, "payment": 1, "total_amount": 1, "version": 1}
+    )
+    # If every precondition holds now, the order changed between the write and this read
+    raise _write_rejection(order, version, **preconditions) or HTTPException(
+        status_code=status.HTTP_409_CONFLICT, detail="Order was modified by another request, please retry"
+    )
+
+
 # ============= Order Routes =============
 
 @router.post("", response_model=Order, status_code=status.HTTP_201_CREATED)
@@ -27,16 +168,21 @@ async def create_order(
     """
     Create a new order.
     """
-    total_amount = 0
-    order_items = []
-    
+    menu_item_ids = []
     for item_in in order_in.items:
         try:
-            menu_item_id = ObjectId(item_in.menu_item_id)
+            menu_item_ids.append(str(ObjectId(item_in.menu_item_id)))
         except Exception:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid menu item ID")
-        
-        menu_item = await db.menu_items.find_one({"_id": menu_item_id})
+
+    # One catalog lookup for the whole ticket instead of a find_one per line
+    menu_items = await menu_catalog.get_many(db, menu_item_ids)
+
+    total_amount = 0
+    order_items = []
+    
+    for item_in, menu_item_id in zip(order_in.items, menu_item_ids):
+        menu_item = menu_items.get(menu_item_id)
         if not menu_item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Menu item not found")
         
@@ -55,7 +201,7 @@ async def create_order(
         total_amount += subtotal
         
         order_items.append({
-            "menu_item_id": str(menu_item_id),
+            "menu_item_id": menu_item_id,
             "quantity": item_in.quantity,
             "special_instructions": item_in.special_instructions,
             "size": item_in.size.dict() if item_in.size else None,
@@ -72,32 +218,293 @@ async def create_order(
         "notes": order_in.notes,
         "total_amount": total_amount,
         "payment": None,
+        "version": 0,
         "created_by": str(current_user.id),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
-    result = await db.orders.insert_one(order_data)
-    created_order = await db.orders.find_one({"_id": result.inserted_id})
+    if order_ingest.running:
+        # The buffer records statistics and publishes the event for the whole batch
+        try:
+            created_order = await order_ingest.insert(order_data)
+        except IngestQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many orders are being placed right now, please retry",
+                headers={"Retry-After": "1"},
+            )
+    else:
+        created_order = await insert_document(db.orders, order_data)
+        await record_changes(db, [(None, created_order)])
+        publish_order_event("order.created", created_order)
     
-    return Order(**created_order, id=str(created_order["_id"]))
+    return _order_response(created_order, status.HTTP_201_CREATED)
+
 
+@router.post("/bulk", response_model=BulkOrderResponse)
+async def bulk_update_orders(
+    bulk_in: BulkOrderRequest,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Apply many status changes and payments in one request. Each operation is
+    checked and applied independently, with the same rules as the single-order
+    endpoints, and gets its own result.
+    """
+    operations = bulk_in.operations
+    results: List[Optional[BulkOrderResult]] = [None] * len(operations)
+
+    def reject(index: int, error: HTTPException):
+        results[index] = BulkOrderResult(
+            index=index, order_id=operations[index].order_id, ok=False,
+            status_code=error.status_code, detail=error.detail,
+        )
 
-@router.get("", response_model=List[Order])
+    obj_ids = {}
+    seen = set()
+    for index, op in enumerate(operations):
+        try:
+            obj_id = ObjectId(op.order_id)
+        except Exception:
+            reject(index, HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order ID"))
+            continue
+        if obj_id in seen:
+            reject(index, HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Order appears more than once in this request"
+            ))
+            continue
+        seen.add(obj_id)
+        obj_ids[index] = obj_id
+
+    # One read for every order involved; needed for validation, rollups and events
+    current = {
+        doc["_id"]: doc
+        for doc in await db.orders.find({"_id": {"$in": list(seen)}}).to_list(None)
+    } if seen else {}
+
+    now = datetime.utcnow()
+    planned = []  # (index, write filter, fields, event_type)
+    for index, obj_id in obj_ids.items():
+        op = operations[index]
+        order = current.get(obj_id)
+        if op.payment:
+            allowed_from = [s.value for s in ACTIVE_ORDER_STATUSES]
+            error = _write_rejection(
+                order, op.version, allowed_from=allowed_from, new_status=OrderStatus.COMPLETED,
+                require_unpaid=True, payment_amount=op.payment.amount,
+            )
+            fields = {
+                "payment": {"method": op.payment.method, "amount": op.payment.amount, "paid_at": now},
+                "status": OrderStatus.COMPLETED,
+                "updated_at": now,
+            }
+            conditions = {"status": {"$in": allowed_from}, "payment": None}
+            event_type = "order.paid"
+        else:
+            allowed_from = statuses_allowing(op.status)
+            error = _write_rejection(order, op.version, allowed_from=allowed_from, new_status=op.status)
+            fields = {"status": op.status, "updated_at": now}
+            conditions = {"status": {"$in": allowed_from}}
+            event_type = "order.cancelled" if op.status == OrderStatus.CANCELLED else "order.status_changed"
+
+        if error:
+            reject(index, error)
+            continue
+
+        # Pin the version we just read, so nothing changed between validation and the write
+        planned.append((index, _write_filter(obj_id, order.get("version", 0), **conditions), fields, event_type))
+
+    # Concurrent conditional writes, each returning the document it replaced: whether
+    # it landed and exactly what it changed are known without reading the orders again
+    outcomes = await asyncio.gather(
+        *[
+            update_document_with_previous(db.orders, query, fields, inc={"version": 1})
+            for _, query, fields, _ in planned
+        ],
+        return_exceptions=True,
+    )
+    applied = []  # (index, before, after, event_type)
+    for (index, _, _, event_type), outcome in zip(planned, outcomes):
+        if isinstance(outcome, PyMongoError):
+            # Safe to retry: the version pin turns a repeat of a landed write into a 409
+            reject(index, HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not apply this operation, please retry"
+            ))
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        elif outcome[0] is None:
+            reject(index, HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Order was modified by another request, please retry"
+            ))
+        else:
+            applied.append((index, outcome[0], outcome[1], event_type))
+
+    if applied:
+        await record_changes(db, [(before, after) for _, before, after, _ in applied])
+    for index, _, after, event_type in applied:
+        order_out = Order(**after, id=str(after["_id"]))
+        publish_order_event(event_type, after)
+        results[index] = BulkOrderResult(
+            index=index, order_id=operations[index].order_id, ok=True, status_code=status.HTTP_200_OK, order=order_out
+        )
+
+    succeeded = sum(1 for r in results if r.ok)
+    return BulkOrderResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+@router.get("", response_model=OrderPage)
 async def list_orders(
     status_filter: OrderStatus = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: AsyncIOMotorDatabase = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get all orders, optionally filtered by status.
+    Get a page of orders, newest first, optionally filtered by status and creation time.
+    Pass the returned `next_cursor` back as `cursor` to get the following page.
     """
-    query = {}
-    if status_filter:
-        query["status"] = status_filter
-    
-    orders = await db.orders.find(query).sort("created_at", -1).to_list(None)
-    return [Order(**order, id=str(order["_id"])) for order in orders]
+    orders, next_cursor = await _find_order_page(
+        db, status_filter, created_from, created_to, cursor, limit
+    )
+    return FastJSONResponse({
+        "items": [document_to_dict(Order, order) for order in orders],
+        "next_cursor": next_cursor,
+    })
+
+
+@router.get("/summary", response_model=OrderSummaryPage)
+async def list_order_summaries(
+    status_filter: OrderStatus = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Same as listing orders, but without line items.
+    """
+    orders, next_cursor = await _find_order_page(
+        db, status_filter, created_from, created_to, cursor, limit, SUMMARY_PROJECTION
+    )
+    return FastJSONResponse({
+        "items": [document_to_dict(OrderSummary, order) for order in orders],
+        "next_cursor": next_cursor,
+    })
+
+
+@router.get("/stats", response_model=OrderStats)
+async def order_stats(
+    day: Optional[date] = None,
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get order counts and revenue from the rollups, for all time or a single (UTC) day.
+    """
+    day_start = datetime(day.year, day.month, day.day) if day else None
+    return await get_order_stats(db, day_start)
+
+
+@router.post("/stats/rebuild", response_model=OrderStats)
+async def rebuild_order_stats(
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Recompute the order rollups and per-menu-item sales counters from scratch. Admin only.
+    """
+    await rebuild_order_rollups(db)
+    await rebuild_menu_item_stats(db)
+    return await get_order_stats(db)
+
+
+@router.post("/archive")
+async def archive_old_orders(
+    older_than_days: int = Query(settings.ORDER_ARCHIVE_AFTER_DAYS, ge=1),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Move completed and cancelled orders older than `older_than_days` into the
+    monthly archive collections. Admin only. Archived orders remain available
+    through GET /api/orders/{id} and the statistics.
+    """
+    moved = await archive_orders(db, older_than_days=older_than_days)
+    return {"archived": sum(moved.values()), "collections": moved}
+
+
+@router.get("/export")
+async def export_orders(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Stream the order history, including archived orders, as NDJSON or CSV with
+    one record per line item, oldest first. `from` is inclusive, `to` exclusive.
+    Admin only.
+    """
+    menu_items = await menu_catalog.get_items(db)
+    item_names = {item_id: item.get("name") for item_id, item in menu_items.items()}
+    rows = iter_export_rows(db, item_names, created_from, created_to)
+
+    filename = f"orders_{datetime.utcnow():%Y%m%d}.{export_format}"
+    if export_format == "csv":
+        body, media_type = csv_chunks(rows), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/stream")
+async def stream_orders(
+    request: Request,
+    current_user: User = Depends(get_current_user_from_query)
+):
+    """
+    Server-Sent Events stream of order changes (order.created, order.updated,
+    order.status_changed, order.paid, order.cancelled). Authenticate with
+    `?token=<access token>`. A client that falls too far behind receives a
+    final `reset` event and should reload its orders before reconnecting.
+    """
+    subscription = order_events.subscribe()
+
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if subscription.dropped and subscription.queue.empty():
+                    yield "event: reset\ndata: {}\n\n"
+                    break
+                try:
+                    yield await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.ORDER_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+        finally:
+            order_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{order_id}", response_model=Order)
@@ -115,21 +522,25 @@ async def get_order(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order ID")
     
     order = await db.orders.find_one({"_id": obj_id})
+    if not order:
+        order = await find_archived_order(db, obj_id)
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     
-    return Order(**order, id=str(order["_id"]))
+    return _order_response(order)
 
 
 @router.put("/{order_id}", response_model=Order)
 async def update_order(
     order_id: str,
     order_in: OrderUpdate,
+    version: Optional[int] = None,
     db: AsyncIOMotorDatabase = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Update an order status or details.
+    Update an order status or details. Paid, completed and cancelled orders can't be changed.
+    Pass the `version` you last saw to fail with 409 if someone else changed it first.
     """
     try:
         obj_id = ObjectId(order_id)
@@ -139,107 +550,148 @@ async def update_order(
     order_data = order_in.dict(exclude_unset=True)
     order_data["updated_at"] = datetime.utcnow()
     
-    result = await db.orders.update_one({"_id": obj_id}, {"$set": order_data})
+    conditions = {"payment": None}
+    if order_in.status:
+        allowed_from = statuses_allowing(order_in.status)
+    else:
+        # Completed and cancelled orders are final, even for edits that leave the status alone
+        allowed_from = [s.value for s in ACTIVE_ORDER_STATUSES]
+    conditions["status"] = {"$in": allowed_from}
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    order, updated_order = await update_document_with_previous(
+        db.orders, _write_filter(obj_id, version, **conditions), order_data, inc={"version": 1}
+    )
     
-    updated_order = await db.orders.find_one({"_id": obj_id})
-    return Order(**updated_order, id=str(updated_order["_id"]))
+    if not order:
+        await _raise_rejected_write(
+            db, obj_id, version, allowed_from=allowed_from, new_status=order_in.status, require_unpaid=True
+        )
+    
+    await record_changes(db, [(order, updated_order)])
+    publish_order_event("order.updated", updated_order)
+    return _order_response(updated_order)
 
 
 @router.put("/{order_id}/status/{new_status}", response_model=Order)
 async def update_order_status(
     order_id: str,
     new_status: OrderStatus,
+    version: Optional[int] = None,
     db: AsyncIOMotorDatabase = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """
     Update order status (e.g., pending -> preparing -> ready -> completed).
+    Transitions not allowed from the current status fail with 409.
     """
     try:
         obj_id = ObjectId(order_id)
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order ID")
     
-    result = await db.orders.update_one(
-        {"_id": obj_id},
-        {"$set": {"status": new_status, "updated_at": datetime.utcnow()}}
+    allowed_from = statuses_allowing(new_status)
+    status_data = {"status": new_status, "updated_at": datetime.utcnow()}
+    order, updated_order = await update_document_with_previous(
+        db.orders,
+        _write_filter(obj_id, version, status={"$in": allowed_from}),
+        status_data,
+        inc={"version": 1},
     )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    if not order:
+        await _raise_rejected_write(db, obj_id, version, allowed_from=allowed_from, new_status=new_status)
     
-    updated_order = await db.orders.find_one({"_id": obj_id})
-    return Order(**updated_order, id=str(updated_order["_id"]))
+    await record_changes(db, [(order, updated_order)])
+    publish_order_event("order.cancelled" if new_status == OrderStatus.CANCELLED else "order.status_changed", updated_order)
+    return _order_response(updated_order)
 
 
 @router.post("/{order_id}/payment", response_model=Order)
 async def pay_order(
     order_id: str,
     payment_in: PaymentCreate,
+    version: Optional[int] = None,
     db: AsyncIOMotorDatabase = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Process payment for an order.
+    Process payment for an order. The order must be open and unpaid.
     """
     try:
         obj_id = ObjectId(order_id)
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order ID")
     
-    order = await db.orders.find_one({"_id": obj_id})
-    if not order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-    
-    # Validate payment amount matches order total
-    if payment_in.amount < order["total_amount"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Payment amount ({payment_in.amount}) is less than order total ({order['total_amount']})"
-        )
-    
     payment = {
         "method": payment_in.method,
         "amount": payment_in.amount,
         "paid_at": datetime.utcnow()
     }
     
-    result = await db.orders.update_one(
-        {"_id": obj_id},
-        {
-            "$set": {
-                "payment": payment,
-                "status": OrderStatus.COMPLETED,
-                "updated_at": datetime.utcnow()
-            }
-        }
+    payment_data = {
+        "payment": payment,
+        "status": OrderStatus.COMPLETED,
+        "updated_at": datetime.utcnow()
+    }
+    # Every precondition is part of the filter, so this is a single atomic write
+    allowed_from = [s.value for s in ACTIVE_ORDER_STATUSES]
+    order, updated_order = await update_document_with_previous(
+        db.orders,
+        _write_filter(
+            obj_id,
+            version,
+            status={"$in": allowed_from},
+            payment=None,
+            total_amount={"$lte": payment_in.amount},
+        ),
+        payment_data,
+        inc={"version": 1},
     )
     
-    updated_order = await db.orders.find_one({"_id": obj_id})
-    return Order(**updated_order, id=str(updated_order["_id"]))
+    if not order:
+        await _raise_rejected_write(
+            db,
+            obj_id,
+            version,
+            allowed_from=allowed_from,
+            new_status=OrderStatus.COMPLETED,
+            require_unpaid=True,
+            payment_amount=payment_in.amount,
+        )
+    
+    await record_changes(db, [(order, updated_order)])
+    publish_order_event("order.paid", updated_order)
+    return _order_response(updated_order)
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_order(
     order_id: str,
+    version: Optional[int] = None,
     db: AsyncIOMotorDatabase = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Cancel an order (soft delete - mark as cancelled).
+    Cancel an order (soft delete - mark as cancelled). Only open orders can be cancelled.
     """
     try:
         obj_id = ObjectId(order_id)
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order ID")
     
-    result = await db.orders.update_one(
-        {"_id": obj_id},
-        {"$set": {"status": OrderStatus.CANCELLED, "updated_at": datetime.utcnow()}}
+    allowed_from = statuses_allowing(OrderStatus.CANCELLED)
+    cancel_data = {"status": OrderStatus.CANCELLED, "updated_at": datetime.utcnow()}
+    order, cancelled_order = await update_document_with_previous(
+        db.orders,
+        _write_filter(obj_id, version, status={"$in": allowed_from}),
+        cancel_data,
+        inc={"version": 1},
     )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    if not order:
+        await _raise_rejected_write(
+            db, obj_id, version, allowed_from=allowed_from, new_status=OrderStatus.CANCELLED
+        )
+    
+    await record_changes(db, [(order, cancelled_order)])
+    publish_order_event("order.cancelled", cancelled_order)
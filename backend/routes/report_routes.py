@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime
+from typing import List, Optional
+
+from core.analytics import (
+    load_sales_frame, top_sellers, revenue_by_category, sales_heatmap, addon_attach_rates, ticket_size
+)
+from core.catalog import menu_catalog
+from core.database import get_database
+from dependencies import get_current_admin_user
+from models.user_models import User
+from models.pos_models import (
+    TopSeller, CategoryRevenue, SalesHeatmap, AddonAttachRate, TicketSize
+)
+
+router = APIRouter(
+    prefix="/api/reports",
+    tags=["Reports"],
+)
+
+# All reports cover completed orders (including archived ones) created in
+# [created_from, created_to). Omitting both covers the whole history.
+
+@router.get("/top-sellers", response_model=List[TopSeller])
+async def report_top_sellers(
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Best-selling menu items by units sold. Admin only.
+    """
+    frame = await load_sales_frame(db, created_from, created_to)
+    menu_items = await menu_catalog.get_items(db)
+    return [
+        TopSeller(**row, name=menu_items.get(row["menu_item_id"], {}).get("name"))
+        for row in top_sellers(frame, limit)
+    ]
+
+
+@router.get("/categories", response_model=List[CategoryRevenue])
+async def report_category_revenue(
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Revenue and units sold per menu category. Admin only.
+    """
+    frame = await load_sales_frame(db, created_from, created_to)
+    menu_items = await menu_catalog.get_items(db)
+    item_categories = {item_id: item.get("category_id") for item_id, item in menu_items.items()}
+    categories = await db.categories.find({}, {"name": 1}).to_list(None)
+    category_names = {str(category["_id"]): category["name"] for category in categories}
+    return [
+        CategoryRevenue(**row, name=category_names.get(row["category_id"]))
+        for row in revenue_by_category(frame, item_categories)
+    ]
+
+
+@router.get("/heatmap", response_model=SalesHeatmap)
+async def report_heatmap(
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Orders and revenue by weekday and hour of day. Admin only.
+    """
+    frame = await load_sales_frame(db, created_from, created_to)
+    return sales_heatmap(frame)
+
+
+@router.get("/addons", response_model=List[AddonAttachRate])
+async def report_addon_attach_rates(
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Share of line items that include each addon. Admin only.
+    """
+    frame = await load_sales_frame(db, created_from, created_to)
+    return addon_attach_rates(frame)
+
+
+@router.get("/ticket-size", response_model=TicketSize)
+async def report_ticket_size(
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Average and median order total and units per order. Admin only.
+    """
+    frame = await load_sales_frame(db, created_from, created_to)
+    return ticket_size(frame)
@@ -0,0 +1,49 @@
+from core.db_monitor import pool_monitor
+from core.metrics import MetricsRegistry
+from core.principal_cache import principal_cache
+from core.rate_limit import rate_limiter
+from security import password_hasher
+
+
+def register_runtime_metrics(registry: MetricsRegistry):
+    """
+    Expose the counters kept by the rate limiter, principal cache, password
+    hasher and Mongo pool monitor, refreshed on every scrape.
+    """
+    rate_limit_rejections = registry.counter(
+        "rate_limit_rejections_total", "Requests rejected by the rate limiter.", ("rule", "reason")
+    )
+    heavy_in_flight = registry.gauge(
+        "rate_limit_heavy_in_flight", "Heavy requests currently admitted."
+    )
+    principal_lookups = registry.counter(
+        "principal_cache_lookups_total", "Authenticated user cache lookups by result.", ("result",)
+    )
+    principal_entries = registry.gauge("principal_cache_entries", "Users held in the principal cache.")
+    hash_pending = registry.gauge("password_hash_pending", "Password hashes queued or running.")
+    hash_rejections = registry.counter(
+        "password_hash_rejections_total", "Password hashes rejected because the pool was full."
+    )
+    pool_connections = registry.gauge(
+        "mongo_pool_connections", "MongoDB connections by state.", ("state",)
+    )
+    pool_checkouts = registry.counter("mongo_pool_checkouts_total", "MongoDB connection checkouts.")
+
+    @registry.collector
+    def collect_runtime_metrics():
+        for (rule, reason), count in list(rate_limiter.rejected.items()):
+            rate_limit_rejections.set(rule, reason, value=count)
+        heavy_in_flight.set(value=rate_limiter.heavy_in_flight)
+
+        cache = principal_cache.stats()
+        for result, key in (("hit", "hits"), ("miss", "misses"), ("coalesced", "coalesced")):
+            principal_lookups.set(result, value=cache[key])
+        principal_entries.set(value=cache["size"])
+
+        hash_pending.set(value=password_hasher.pending)
+        hash_rejections.set(value=password_hasher.rejected)
+
+        pool = pool_monitor.stats()
+        pool_connections.set("open", value=pool["connections_open"])
+        pool_connections.set("checked_out", value=pool["checked_out"])
+        pool_checkouts.set(value=pool["checkouts"])
@@ -14,6 +14,9 @@ async def seed_database():
     await db.categories.delete_many({})
     await db.menu_items.delete_many({})
     await db.orders.delete_many({})
+    await db.order_rollups.delete_many({})
+    await db.menu_item_stats.delete_many({})
+    await db.menu_item_daily_stats.delete_many({})
 
     # Create admin user
     admin_user = {
@@ -0,0 +1,66 @@
+"""
+Smoke check: send a few requests through the full ASGI app, middleware
+included, and fail if any of them errors. No database needed; every request
+here is answered before a query would run.
+
+    python smoke_check.py
+"""
+import asyncio
+import sys
+
+from main import app
+
+# (method, path, expected status)
+CHECKS = [
+    ("GET", "/api/health", 200),
+    ("GET", "/api/orders", 401),
+    ("GET", "/api/menu/items/not-an-id", 400),
+    ("GET", "/api/reports/top-sellers", 401),
+    ("GET", "/api/does-not-exist", 404),
+    ("GET", "/metrics", 200),
+]
+
+
+async def request(method: str, path: str) -> int:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def main() -> int:
+    failures = 0
+    for method, path, expected in CHECKS:
+        try:
+            status = await request(method, path)
+        except Exception as e:
+            status = f"{type(e).__name__}: {e}"
+        ok = status == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {method} {path} -> {status} (expected {expected})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
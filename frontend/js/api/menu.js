@@ -7,6 +7,17 @@ export async function fetchCategories() {
     const categories = await apiCall('/menu/categories/public');
     if (categories) {
         appState.categories = categories;
+        // Views built on the full menu reload it after a partial refresh
+        appState.fullMenu = [];
+    }
+}
+
+export async function fetchFullMenu() {
+    const menu = await apiCall('/menu/full');
+    if (menu) {
+        appState.fullMenu = menu;
+        appState.categories = menu.map(({ items, ...category }) => category);
+        appState.menuItems = menu.flatMap(category => category.items);
     }
 }
 
@@ -19,6 +30,7 @@ export async function fetchMenuItems(categoryId = null) {
     console.log("Received items from API:", items);
     if (items) {
         appState.menuItems = items;
+        appState.fullMenu = [];
     }
 }
 
@@ -3,15 +3,42 @@ import { appState } from '../app.js';
 import { showError, showSuccess } from '../utils/errors.js';
 import { renderApp } from '../app.js';
 
-export async function fetchOrders(status = null) {
-    let endpoint = '/orders';
+export async function fetchOrders(status = null, cursor = null) {
+    const params = new URLSearchParams();
     if (status) {
-        endpoint += `?status_filter=${status}`;
+        params.set('status_filter', status);
     }
-    const orders = await apiCall(endpoint);
-    if (orders) {
-        appState.orders = orders;
+    if (cursor) {
+        params.set('cursor', cursor);
     }
+    const query = params.toString();
+    const page = await apiCall(`/orders${query ? `?${query}` : ''}`);
+    if (page) {
+        appState.orders = cursor ? appState.orders.concat(page.items) : page.items;
+        appState.ordersNextCursor = page.next_cursor;
+    }
+}
+
+export async function fetchRecentOrders(limit = 5) {
+    const page = await apiCall(`/orders/summary?limit=${limit}`);
+    if (page) {
+        appState.recentOrders = page.items;
+    }
+}
+
+export async function fetchOrderStats() {
+    const stats = await apiCall('/orders/stats');
+    if (stats) {
+        appState.orderStats = stats;
+    }
+}
+
+export function subscribeToOrderEvents(onEvent) {
+    const source = new EventSource(`/api/orders/stream?token=${encodeURIComponent(appState.token)}`);
+    ['order.created', 'order.updated', 'order.status_changed', 'order.paid', 'order.cancelled', 'reset'].forEach(type => {
+        source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+    });
+    return source;
 }
 
 export async function createOrder(cartItems) {
@@ -15,8 +15,12 @@ export let appState = {
     token: null,
     categories: [],
     menuItems: [],
+    fullMenu: [],
     cart: [],
     orders: [],
+    ordersNextCursor: null,
+    recentOrders: [],
+    orderStats: null,
     currentView: 'login',
     selectedCategory: null
 };
@@ -1,6 +1,7 @@
 import { appState } from '../app.js';
 import { formatCurrency } from '../utils/formatters.js';
 import { addToCart } from './cart.js';
+import { menuItemImage } from '../utils/images.js';
 
 function openOptionsModal(itemId) {
     const item = appState.menuItems.find(i => i.id === itemId);
@@ -95,7 +96,7 @@ export function renderMenuItems(container) {
         <div class="bg-white rounded-lg shadow-md hover:shadow-lg transition overflow-hidden border-2 border-transparent hover:border-blue-300">
             <div class="bg-gradient-to-br from-blue-400 to-blue-600 h-40 flex items-center justify-center overflow-hidden">
                 ${item.image_url ?
-                    `<img src="${item.image_url}" alt="${item.name}" class="w-full h-full object-cover">` :
+                    menuItemImage(item) :
                     `<span class="text-7xl">${item.emoji || '🍽️'}</span>`
                 }
             </div>
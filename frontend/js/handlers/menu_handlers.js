@@ -4,7 +4,12 @@ import { renderPublicMenuView } from '../views/public_menu.js';
 
 export async function selectCategory(categoryId, isPublic = false) {
     appState.selectedCategory = categoryId;
-    if (categoryId) {
+    if (appState.fullMenu.length > 0) {
+        // The full menu is already loaded; filter it instead of asking the server
+        appState.menuItems = categoryId
+            ? (appState.fullMenu.find(category => category.id === categoryId)?.items || [])
+            : appState.fullMenu.flatMap(category => category.items);
+    } else if (categoryId) {
         await fetchMenuItems(categoryId);
     } else {
         await fetchMenuItems();
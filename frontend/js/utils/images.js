@@ -0,0 +1,14 @@
+// Menu item image markup: the resized WebP variant with a JPEG/PNG fallback
+// when the item has variants, otherwise the original image URL.
+export function menuItemImage(item, variant = 'medium', classes = 'w-full h-full object-cover') {
+    const files = item.image_variants && item.image_variants[variant];
+    if (!files) {
+        return `<img src="${item.image_url}" alt="${item.name}" class="${classes}" loading="lazy">`;
+    }
+    return `
+        <picture>
+            <source srcset="${files.webp}" type="image/webp">
+            <img src="${files.fallback}" alt="${item.name}" class="${classes}" loading="lazy">
+        </picture>
+    `;
+}
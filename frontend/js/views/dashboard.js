@@ -3,6 +3,7 @@ import { appState, renderApp } from '../app.js';
 import { formatCurrency } from '../utils/formatters.js';
 import { switchView } from '../handlers/view_handlers.js';
 import { logout } from '../api/api.js';
+import { fetchOrderStats, fetchRecentOrders } from '../api/orders.js';
 
 export async function renderDashboard(content) {
     const welcomeName = appState.user?.full_name || 'User';
@@ -35,28 +36,31 @@ export async function renderDashboard(content) {
     }
     // END TEMPORARY
 
+    await Promise.all([fetchOrderStats(), fetchRecentOrders()]);
+    const stats = appState.orderStats || { total_orders: 0, completed: 0, in_progress: 0, revenue: 0 };
+
     const statsGrid = document.getElementById('stats-grid');
     statsGrid.innerHTML = `
         <div class="bg-white rounded-lg shadow-lg p-6 border-l-4 border-blue-600">
             <h3 class="text-gray-600 text-sm font-semibold mb-2">Total Orders</h3>
-            <p class="text-4xl font-bold text-blue-600">${appState.orders.length}</p>
+            <p class="text-4xl font-bold text-blue-600">${stats.total_orders}</p>
         </div>
         <div class="bg-white rounded-lg shadow-lg p-6 border-l-4 border-green-600">
             <h3 class="text-gray-600 text-sm font-semibold mb-2">Completed</h3>
-            <p class="text-4xl font-bold text-green-600">${appState.orders.filter(o => o.status === 'completed').length}</p>
+            <p class="text-4xl font-bold text-green-600">${stats.completed}</p>
         </div>
         <div class="bg-white rounded-lg shadow-lg p-6 border-l-4 border-yellow-600">
             <h3 class="text-gray-600 text-sm font-semibold mb-2">In Progress</h3>
-            <p class="text-4xl font-bold text-yellow-600">${appState.orders.filter(o => ['pending', 'preparing', 'ready'].includes(o.status)).length}</p>
+            <p class="text-4xl font-bold text-yellow-600">${stats.in_progress}</p>
         </div>
         <div class="bg-white rounded-lg shadow-lg p-6 border-l-4 border-purple-600">
             <h3 class="text-gray-600 text-sm font-semibold mb-2">Revenue</h3>
-            <p class="text-4xl font-bold text-purple-600">${formatCurrency(appState.orders.filter(o => o.status === 'completed' && o.payment).reduce((sum, o) => sum + (o.payment?.amount || 0), 0))}</p>
+            <p class="text-4xl font-bold text-purple-600">${formatCurrency(stats.revenue)}</p>
         </div>
     `;
 
     const recentOrdersContainer = document.getElementById('recent-orders-container');
-    if (appState.orders.length === 0) {
+    if (appState.recentOrders.length === 0) {
         recentOrdersContainer.innerHTML = `
             <div class="text-center py-8">
                 <p class="text-gray-500 text-lg">No orders yet. Start by creating one!</p>
@@ -76,7 +80,7 @@ export async function renderDashboard(content) {
                         </tr>
                     </thead>
                     <tbody class="divide-y divide-gray-200">
-                        ${appState.orders.slice(-5).reverse().map(order => {
+                        ${appState.recentOrders.map(order => {
                             const statusColors = {
                                 'pending': 'bg-yellow-100 text-yellow-800',
                                 'preparing': 'bg-blue-100 text-blue-800',
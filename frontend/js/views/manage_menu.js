@@ -4,6 +4,7 @@ import { fetchCategories, fetchMenuItems, updateMenuItem, uploadMenuImage, updat
 import { returnToDashboard } from '../handlers/view_handlers.js';
 import { logout } from '../api/api.js';
 import { showSuccess, showError } from '../utils/errors.js';
+import { menuItemImage } from '../utils/images.js';
 
 let currentEditItemId = null;
 
@@ -185,7 +186,7 @@ export async function renderManageMenuView(content) {
             <div class="border-2 border-gray-200 rounded-lg p-4 hover:border-blue-400 transition">
                 <div class="mb-4 bg-gray-100 h-40 rounded-lg flex items-center justify-center overflow-hidden">
                     ${item.image_url ?
-                        `<img src="${item.image_url}" alt="${item.name}" class="w-full h-full object-cover">` :
+                        menuItemImage(item) :
                         `<div class="text-center"><p class="text-6xl mb-2">${item.emoji || '🍽️'}</p><p class="text-gray-500 text-sm">No image</p></div>`
                     }
                 </div>
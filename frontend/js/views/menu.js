@@ -1,6 +1,6 @@
 import { loadHTML } from '../utils/dom.js';
 import { appState } from '../app.js';
-import { fetchCategories, fetchMenuItems } from '../api/menu.js';
+import { fetchFullMenu } from '../api/menu.js';
 import { renderCart } from '../components/cart.js';
 import { renderCategories } from '../components/categories.js';
 import { renderMenuItems } from '../components/menu_items.js';
@@ -10,10 +10,9 @@ import { logout } from '../api/api.js';
 export async function renderMenuView(content) {
     console.log("Entering renderMenuView");
     // Fetch categories and menu items if they haven't been loaded yet
-    if (appState.categories.length === 0 || appState.menuItems.length === 0) {
+    if (appState.fullMenu.length === 0) {
         console.log("Fetching categories and menu items...");
-        await fetchCategories();
-        await fetchMenuItems();
+        await fetchFullMenu();
         console.log("Fetched categories:", appState.categories);
         console.log("Fetched menu items:", appState.menuItems);
     }
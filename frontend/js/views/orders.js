@@ -1,12 +1,14 @@
 import { loadHTML } from '../utils/dom.js';
 import { appState } from '../app.js';
-import { fetchOrders, updateOrderStatus } from '../api/orders.js';
+import { fetchOrders, subscribeToOrderEvents, updateOrderStatus } from '../api/orders.js';
 import { fetchMenuItems } from '../api/menu.js';
 import { returnToDashboard, switchView } from '../handlers/view_handlers.js';
 import { showPaymentForm } from '../components/payment_form.js';
 import { logout } from '../api/api.js';
 import { formatCurrency } from '../utils/formatters.js';
 
+let orderStream = null;
+
 export async function renderOrdersView(content) {
     content.innerHTML = await loadHTML('orders');
 
@@ -21,15 +23,51 @@ export async function renderOrdersView(content) {
 
     // Initial render
     await renderOrderList();
+    watchOrders(() => statusFilter.value || null);
+}
+
+function watchOrders(getStatus) {
+    if (orderStream) {
+        orderStream.close();
+    }
+    orderStream = subscribeToOrderEvents((type, data) => {
+        // Stop listening once the orders view has been left
+        if (!document.getElementById('orders-list')) {
+            orderStream.close();
+            orderStream = null;
+            return;
+        }
+        if (type === 'reset') {
+            renderOrderList(getStatus());
+            return;
+        }
+        const status = getStatus();
+        const order = data.order;
+        const index = appState.orders.findIndex(o => o.id === order.id);
+        if (index !== -1) {
+            appState.orders.splice(index, 1);
+        }
+        if (!status || order.status === status) {
+            appState.orders.splice(index !== -1 ? index : 0, 0, order);
+        }
+        drawOrderList(status);
+    });
 }
 
-async function renderOrderList(status = null) {
-    await fetchOrders(status);
+async function renderOrderList(status = null, cursor = null) {
+    await fetchOrders(status, cursor);
     if (appState.menuItems.length === 0) {
         await fetchMenuItems();
     }
+    drawOrderList(status);
+}
 
-    const menuItemMap = appState.menuItems.reduce((map, item) => {
+function drawOrderList(status) {
+    // menuItems may be narrowed to one category; the full menu has every item
+    const knownItems = appState.fullMenu.length > 0
+        ? appState.fullMenu.flatMap(category => category.items)
+        : appState.menuItems;
+    const menuItemMap = knownItems.reduce((map, item) => {
         map[item.id] = item.name;
         return map;
     }, {});
@@ -117,6 +155,17 @@ async function renderOrderList(status = null) {
         `).join('');
     }
 
+    if (appState.ordersNextCursor) {
+        ordersList.insertAdjacentHTML('beforeend', `
+            <div class="text-center">
+                <button id="load-more-orders" class="bg-gray-600 text-white px-6 py-2 rounded-lg hover:bg-gray-700 font-semibold">Load More</button>
+            </div>
+        `);
+        document.getElementById('load-more-orders').addEventListener('click', () => {
+            renderOrderList(status, appState.ordersNextCursor);
+        });
+    }
+
     ordersList.querySelectorAll('.update-status-button').forEach(button => {
         button.addEventListener('click', () => updateOrderStatus(button.dataset.orderId, button.dataset.status));
     });
@@ -1,8 +1,9 @@
 import { loadHTML } from '../utils/dom.js';
 import { appState, renderApp } from '../app.js';
-import { fetchCategories, fetchMenuItems } from '../api/menu.js';
+import { fetchFullMenu } from '../api/menu.js';
 import { formatCurrency } from '../utils/formatters.js';
 import { selectCategory } from '../handlers/menu_handlers.js';
+import { menuItemImage } from '../utils/images.js';
 
 export async function renderPublicMenuView() {
     const menuView = document.getElementById('public-menu-view');
@@ -10,9 +11,8 @@ export async function renderPublicMenuView() {
     const content = document.getElementById('content');
     content.classList.add('hidden');
 
-    if (appState.categories.length === 0) {
-        await fetchCategories();
-        await fetchMenuItems();
+    if (appState.fullMenu.length === 0) {
+        await fetchFullMenu();
     }
 
     menuView.innerHTML = await loadHTML('public_menu');
@@ -46,7 +46,7 @@ export async function renderPublicMenuView() {
             <div class="bg-white rounded-lg shadow-md hover:shadow-lg transition overflow-hidden border-2 border-transparent hover:border-blue-300">
                 <div class="bg-gradient-to-br from-blue-400 to-blue-600 h-40 flex items-center justify-center overflow-hidden">
                     ${item.image_url ?
-                        `<img src="${item.image_url}" alt="${item.name}" class="w-full h-full object-cover">` :
+                        menuItemImage(item) :
                         `<span class="text-7xl">${item.emoji || '🍽️'}</span>`
                     }
                 </div>